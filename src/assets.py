@@ -0,0 +1,177 @@
+import os
+
+from profiler import timed
+
+COPY_MODES = ("copy", "hardlink", "reflink", "sendfile")
+# ioctl request number for FICLONE on Linux (btrfs, xfs, bcachefs...).
+FICLONE = 0x40049409
+# Per-output build state kept by the post-processing stages, one
+# subdirectory per output directory.
+STATE_DIR = ".build/outputs"
+
+
+def file_hash(path):
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_entry(path, previous):
+    stat = os.stat(path)
+    if (
+        previous is not None
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime") == stat.st_mtime_ns
+        and "hash" in previous
+    ):
+        digest = previous["hash"]
+    else:
+        digest = file_hash(path)
+    return {"hash": digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def state_path(dest_dir, name, state_dir=STATE_DIR):
+    # State describing an output directory is kept out of it, so a deploy of
+    # public/ publishes only the site.
+    key = os.path.abspath(dest_dir).strip(os.sep).replace(os.sep, "_")
+    return os.path.join(state_dir, key, name)
+
+
+def load_state(path):
+    import json
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(path, data):
+    import json
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def remove_output(path, root):
+    if os.path.isfile(path) or os.path.islink(path):
+        os.remove(path)
+    directory = os.path.dirname(path)
+    while directory and os.path.abspath(directory) != os.path.abspath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def replace_text(path, text):
+    # Goes through a new file rather than writing in place: with hardlinked
+    # assets the old inode may be shared with static/.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _reflink(source, dest):
+    import fcntl
+
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _sendfile(source, dest):
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        offset = 0
+        while remaining > 0:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, remaining)
+            if sent == 0:
+                break
+            offset += sent
+            remaining -= sent
+
+
+def copy_file(source, dest, mode="copy"):
+    import shutil
+
+    # Always start from a fresh file: writing into an existing hardlink would
+    # modify the source it points at.
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        if mode == "hardlink":
+            os.link(source, dest)
+            return
+        if mode == "reflink":
+            _reflink(source, dest)
+            shutil.copystat(source, dest)
+            return
+        if mode == "sendfile":
+            _sendfile(source, dest)
+            shutil.copystat(source, dest)
+            return
+    except (OSError, AttributeError):
+        # Cross-device links, filesystems without reflinks and platforms
+        # without sendfile all fall back to a plain copy.
+        if os.path.lexists(dest):
+            os.remove(dest)
+    shutil.copy2(source, dest)
+
+
+def _changed(entry, current, compare):
+    if entry is None:
+        return True
+    if compare == "hash":
+        return entry.get("hash") != current["hash"]
+    return entry.get("size") != current["size"] or entry.get("mtime") != current["mtime"]
+
+
+@timed("sync_assets")
+def sync_assets(source, dest, previous, mode="copy", compare="mtime", workers=8):
+    if not os.path.isdir(source):
+        raise Exception("Source not a directory")
+    if mode not in COPY_MODES:
+        raise ValueError(f"unknown copy mode: {mode}")
+    current = {}
+    jobs = []
+    directories = set()
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            source_object = os.path.join(root, name)
+            rel_path = os.path.relpath(source_object, source)
+            dest_object = os.path.join(dest, rel_path)
+            entry = previous.get(rel_path)
+            if compare == "hash":
+                current[rel_path] = source_entry(source_object, entry)
+            else:
+                stat = os.stat(source_object)
+                current[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            if _changed(entry, current[rel_path], compare) or not os.path.exists(dest_object):
+                directories.add(os.path.dirname(dest_object))
+                jobs.append((source_object, dest_object))
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda job: copy_file(job[0], job[1], mode), jobs))
+    else:
+        for source_object, dest_object in jobs:
+            copy_file(source_object, dest_object, mode)
+    removed = 0
+    for rel_path in previous:
+        if rel_path not in current:
+            remove_output(os.path.join(dest, rel_path), dest)
+            removed += 1
+    print(f"Static assets: {len(jobs)} copied, {removed} removed")
+    return current
@@ -0,0 +1,261 @@
+import mmap
+import os
+import struct
+from sys import intern
+
+from htmlnode import LeafNode, ParentNode, RawNode
+
+MAGIC = b"SSGAST"
+# FORMAT_VERSION covers the byte layout below; TREE_VERSION must be bumped
+# whenever markdown_to_html_node starts building different trees.
+FORMAT_VERSION = 1
+TREE_VERSION = 1
+# magic, format, tree version, source digest, node count, prop count,
+# string count.
+HEADER = struct.Struct("<6sHH32sIII")
+# kind, tag, value, child count, prop count. Strings are referenced by their
+# 1-based position in the string table; 0 means None.
+NODE = struct.Struct("<BIIII")
+PROP = struct.Struct("<II")
+LENGTH = struct.Struct("<I")
+LEAF, PARENT, RAW = 1, 2, 3
+
+
+class StaleCache(Exception):
+    pass
+
+
+def _kind(node):
+    if isinstance(node, RawNode):
+        return RAW
+    if isinstance(node, ParentNode):
+        return PARENT
+    if isinstance(node, LeafNode):
+        return LEAF
+    raise TypeError(f"cannot cache {type(node).__name__}")
+
+
+def encode_tree(root, digest):
+    strings = {}
+
+    def ref(text):
+        if text is None:
+            return 0
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings) + 1
+        return index
+
+    # Nodes are stored in document order, each followed by its children,
+    # with all props in a separate region so both regions hold fixed-size
+    # records.
+    nodes = []
+    props = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = list(node.children) if node.children is not None else ()
+        node_props = node.props or {}
+        nodes.append(
+            NODE.pack(
+                _kind(node), ref(node.tag), ref(node.value), len(children), len(node_props)
+            )
+        )
+        for key, value in node_props.items():
+            props.append(PROP.pack(ref(key), ref(value)))
+        stack.extend(reversed(children))
+    table = []
+    for text in strings:
+        data = text.encode()
+        table.append(LENGTH.pack(len(data)))
+        table.append(data)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, TREE_VERSION, digest, len(nodes), len(props), len(strings)
+    )
+    return b"".join((header, *nodes, *props, *table))
+
+
+def _read_strings(buffer, view, offset, count):
+    strings = [None]
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(buffer, offset)
+        offset += LENGTH.size
+        if offset + length > len(buffer):
+            raise StaleCache("truncated string table")
+        strings.append(str(view[offset : offset + length], "utf-8"))
+        offset += length
+    if offset != len(buffer):
+        raise StaleCache("trailing data after the string table")
+    return strings
+
+
+def decode_tree(buffer, digest=None):
+    try:
+        magic, fmt, tree, stored, node_count, prop_count, string_count = HEADER.unpack_from(
+            buffer, 0
+        )
+    except struct.error:
+        raise StaleCache("truncated header") from None
+    if magic != MAGIC or fmt != FORMAT_VERSION or tree != TREE_VERSION:
+        raise StaleCache("written by a different version")
+    if digest is not None and stored != digest:
+        raise StaleCache("source changed")
+    props_offset = HEADER.size + node_count * NODE.size
+    strings_offset = props_offset + prop_count * PROP.size
+    if strings_offset > len(buffer):
+        raise StaleCache("truncated node records")
+    view = memoryview(buffer)
+    node_view = view[HEADER.size : props_offset]
+    prop_view = view[props_offset:strings_offset]
+    props = records = None
+    try:
+        strings = _read_strings(buffer, view, strings_offset, string_count)
+        props = PROP.iter_unpack(prop_view)
+        records = NODE.iter_unpack(node_view)
+        tags = {}
+        new = object.__new__
+        root = None
+        # Each entry is a parent's children list and how many it still needs.
+        pending = []
+        for kind, tag, value, children, prop_count in records:
+            # Nodes are filled in directly rather than through __init__; the
+            # interned tag is looked up once per distinct tag.
+            if kind == PARENT:
+                node = new(ParentNode)
+                node.children = []
+            elif kind == LEAF or kind == RAW:
+                node = new(RawNode if kind == RAW else LeafNode)
+                node.children = None
+            else:
+                raise StaleCache(f"unknown node kind {kind}")
+            if tag:
+                interned = tags.get(tag)
+                if interned is None:
+                    interned = tags[tag] = intern(strings[tag])
+                node.tag = interned
+            else:
+                node.tag = None
+            node.value = strings[value]
+            if prop_count:
+                node.props = {}
+                for _ in range(prop_count):
+                    key, prop = next(props)
+                    node.props[strings[key]] = strings[prop]
+            else:
+                node.props = None
+            if pending:
+                parent = pending[-1]
+                parent[0].append(node)
+                parent[1] -= 1
+            else:
+                root = node
+            if children:
+                if kind != PARENT:
+                    raise StaleCache("leaf node with children")
+                pending.append([node.children, children])
+            while pending and not pending[-1][1]:
+                pending.pop()
+        if pending or root is None:
+            raise StaleCache("node records do not match the header")
+        return root
+    except (struct.error, IndexError, StopIteration, UnicodeDecodeError) as e:
+        raise StaleCache(f"corrupt cache: {e!r}") from None
+    finally:
+        # The iterators hold exports of the views, and a view with exports
+        # raises BufferError on release, so they go first.
+        props = records = None
+        prop_view.release()
+        node_view.release()
+        view.release()
+
+
+class AstCache:
+
+    def __init__(self, directory=".build/ast") -> None:
+        self.enabled = False
+        self.directory = directory
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def drain_counters(self):
+        counters = {"hits": self.hits, "misses": self.misses, "rejected": self.rejected}
+        self.reset_counters()
+        return counters
+
+    def merge_counters(self, counters):
+        self.hits += counters["hits"]
+        self.misses += counters["misses"]
+        self.rejected += counters["rejected"]
+
+    def path(self, from_path):
+        import hashlib
+
+        name = hashlib.blake2b(os.path.abspath(from_path).encode(), digest_size=16)
+        return os.path.join(self.directory, name.hexdigest() + ".ast")
+
+    def digest(self, content):
+        import hashlib
+
+        return hashlib.blake2b(content.encode(), digest_size=32).digest()
+
+    def load(self, from_path, digest):
+        try:
+            with open(self.path(from_path), "rb") as f:
+                # Nodes are decoded straight out of the page cache instead of
+                # reading the file into a bytes object first.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return decode_tree(buffer, digest)
+        except (FileNotFoundError, ValueError):
+            # ValueError: mmap refuses empty files.
+            return None
+
+    def store(self, from_path, digest, root):
+        path = self.path(from_path)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode_tree(root, digest))
+        os.replace(tmp_path, path)
+
+    def tree(self, from_path, content, parse):
+        digest = self.digest(content)
+        try:
+            root = self.load(from_path, digest)
+        except (StaleCache, struct.error, BufferError, UnicodeDecodeError, IndexError):
+            # Anything that fails to decode is a miss; the file is removed so
+            # the next store starts clean.
+            self.rejected += 1
+            root = None
+            try:
+                os.remove(self.path(from_path))
+            except OSError:
+                pass
+        if root is not None:
+            self.hits += 1
+            return root
+        self.misses += 1
+        root = parse(content)
+        self.store(from_path, digest, root)
+        return root
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".ast"):
+                os.remove(os.path.join(self.directory, name))
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return (
+            f"AST cache: {self.hits} hits, {self.misses} misses "
+            f"({self.rejected} stale), {rate:.0%} hit rate"
+        )
+
+
+AST_CACHE = AstCache()
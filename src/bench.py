@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from textnode import TextNode, TextType
+import build
+import corpus
+import main
+
+
+def chained_text_to_textnodes(text):
+    nodes = main.split_nodes_delimiter([TextNode(text, TextType.NORMAL)], "**", TextType.BOLD)
+    nodes = main.split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = main.split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = main.split_nodes_link(nodes)
+    return main.split_nodes_image(nodes)
+
+
+def link_dense_paragraph(links):
+    parts = []
+    for i in range(links):
+        parts.append(f"see [link number {i}](/pages/{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"![image {i}](/images/{i}.png) with `code {i}` ")
+        if i % 50 == 0:
+            parts.append(f"**bold {i}** then ")
+    return "".join(parts)
+
+
+def best_time(func, arg, repeat):
+    return min(timeit.repeat(lambda: func(arg), number=1, repeat=repeat))
+
+
+def bench_inline(args):
+    print(f"{'links':>8} {'chained (ms)':>14} {'single pass (ms)':>18} {'speedup':>9}")
+    for links in (10, 100, 1000, args.size):
+        # The chained splitters recurse once per link in a run of plain text.
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), links * 4))
+        text = link_dense_paragraph(links)
+        if chained_text_to_textnodes(text) != main.text_to_textnodes(text):
+            raise Exception(f"tokenizer output differs for {links} links")
+        chained = best_time(chained_text_to_textnodes, text, args.repeat)
+        single = best_time(main.text_to_textnodes, text, args.repeat)
+        print(
+            f"{links:>8} {chained * 1000:>14.2f} {single * 1000:>18.2f} "
+            f"{chained / single:>8.1f}x"
+        )
+
+
+def measure_peak(func):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        return elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def large_page(paragraphs):
+    blocks = [f"## Section {i}\n\n{link_dense_paragraph(20)}" for i in range(paragraphs)]
+    return "# Large page\n\n" + "\n\n".join(blocks)
+
+
+def bench_serialize(args):
+    node = main.markdown_to_html_node(large_page(args.size))
+    with tempfile.TemporaryFile("w") as sink:
+        def concatenated():
+            sink.seek(0)
+            sink.write(node.to_html())
+
+        def streamed():
+            sink.seek(0)
+            node.write_html(sink)
+
+        for name, func in (("to_html + write", concatenated), ("write_html", streamed)):
+            elapsed, peak = measure_peak(func)
+            print(f"{name:>16}: {elapsed * 1000:8.1f} ms, peak {peak / 1024:10.1f} KiB")
+
+
+def bench_stream(args):
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "index.md")
+        template = os.path.join(root, "template.html")
+        with open(source, "w") as f:
+            f.write(large_page(args.size))
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        size = os.path.getsize(source)
+        print(f"page size: {size / 1024:.0f} KiB")
+        threshold = main.STREAM_THRESHOLD
+        try:
+            for name, main.STREAM_THRESHOLD in (("buffered", size + 1), ("streamed", 0)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    elapsed, peak = measure_peak(
+                        lambda: main.generate_page(source, template, root)
+                    )
+                print(f"{name:>10}: {elapsed * 1000:8.1f} ms, peak {peak / 1024:10.1f} KiB")
+        finally:
+            main.STREAM_THRESHOLD = threshold
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children is not None:
+            stack.extend(node.children)
+    return count
+
+
+def bench_memory(args):
+    pages = [large_page(20) for _ in range(args.size // 20 or 1)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    trees = [main.markdown_to_html_node(page) for page in pages]
+    tree_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    nodes = sum(count_nodes(tree) for tree in trees)
+    with tempfile.TemporaryFile("w") as sink:
+        for tree in trees:
+            tree.write_html(sink)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"pages: {len(pages)}, nodes: {nodes}")
+    print(f"bytes per node: {tree_bytes / nodes:.1f}")
+    print(f"peak RSS: {peak_rss / 1024:.1f} MiB")
+
+
+def time_stage(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def run_suite(root, args):
+    content = os.path.join(root, "content")
+    template = os.path.join(root, "template.html")
+    with open(template, "w") as f:
+        f.write("<title>{{ Title }}</title>\n{{ Content }}\n")
+    paths = corpus.generate_corpus(
+        content, pages=args.pages, seed=args.seed, depth=args.depth,
+        paragraph_words=args.paragraph_words,
+    )
+    documents = []
+    for path in paths:
+        with open(path) as f:
+            documents.append(f.read())
+    blocks = [block for document in documents for block in main.markdown_to_blocks(document)]
+    paragraphs = [
+        block.replace("\n", " ")
+        for block in blocks
+        if main.block_to_block_type(block) == main.block_type_paragraph
+    ]
+    trees = [main.markdown_to_html_node(document) for document in documents]
+    pages = main.collect_pages(content, template, os.path.join(root, "public"))
+
+    def site_build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            build.generate_pages(pages)
+
+    stages = {
+        "blocks": lambda: [main.markdown_to_blocks(document) for document in documents],
+        "block_typing": lambda: [main.block_to_block_type(block) for block in blocks],
+        "inline": lambda: [main.text_to_textnodes(text) for text in paragraphs],
+        "markdown_to_html_node": lambda: [
+            main.markdown_to_html_node(document) for document in documents
+        ],
+        "serialization": lambda: [tree.to_html() for tree in trees],
+        "site_build": site_build,
+    }
+    results = {}
+    for name, func in stages.items():
+        results[name] = time_stage(func, args.repeat)
+    return {
+        "corpus": {
+            "pages": args.pages,
+            "seed": args.seed,
+            "depth": args.depth,
+            "paragraph_words": args.paragraph_words,
+            "bytes": sum(len(document) for document in documents),
+            "blocks": len(blocks),
+        },
+        "stages": results,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    regressions = []
+    for name, seconds in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            continue
+        change = seconds / before - 1
+        marker = ""
+        if change > threshold:
+            marker = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<24} {before * 1000:>10.2f} {seconds * 1000:>10.2f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def bench_suite(args):
+    with tempfile.TemporaryDirectory() as root:
+        results = run_suite(root, args)
+    print(f"corpus: {results['corpus']}")
+    for name, seconds in results["stages"].items():
+        print(f"{name:<24} {seconds * 1000:>10.2f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["corpus"] != results["corpus"]:
+            print("warning: comparing runs on different corpora")
+        print(f"{'stage':<24} {'before ms':>10} {'after ms':>10} {'change':>8}")
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than the {args.threshold:.0%} threshold")
+            sys.exit(1)
+
+
+# Modules that only the flags switching them on should pull in.
+FEATURE_MODULES = (
+    "assets", "astcache", "blockcache", "catalog", "depgraph", "resolve", "search",
+)
+IMPORT_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import main
+print(" ".join(name for name in sys.argv[2:] if name in sys.modules))
+"""
+FIRST_PAGE_SCRIPT = """
+import contextlib, io, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    main.generate_page(*sys.argv[2:])
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def time_process(command, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result.stdout)
+    return best
+
+
+def bench_startup(args):
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "index.md")
+        template = os.path.join(root, "template.html")
+        with open(source, "w") as f:
+            f.write(large_page(10))
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        # Interpreter startup is measured separately and subtracted so the
+        # numbers only cover our own imports and the first render.
+        interpreter, _ = time_process([sys.executable, "-c", "pass"], args.repeat)
+        imported, eager = time_process(
+            [sys.executable, "-c", IMPORT_SCRIPT, src_dir, *FEATURE_MODULES], args.repeat
+        )
+        first_page, output = time_process(
+            [sys.executable, "-c", FIRST_PAGE_SCRIPT, src_dir, source, template, root],
+            args.repeat,
+        )
+    import_seconds, render_seconds = (float(value) for value in output.split())
+    print(f"{'interpreter':>12}: {interpreter * 1000:8.1f} ms")
+    print(
+        f"{'import':>12}: {(imported - interpreter) * 1000:8.1f} ms "
+        f"({import_seconds * 1000:.1f} ms in process)"
+    )
+    print(
+        f"{'first page':>12}: {(first_page - interpreter) * 1000:8.1f} ms "
+        f"({render_seconds * 1000:.1f} ms rendering)"
+    )
+    print(f"{'eager':>12}: {eager.strip() or 'none'}")
+
+
+BENCHMARKS = {
+    "inline": bench_inline,
+    "serialize": bench_serialize,
+    "memory": bench_memory,
+    "stream": bench_stream,
+    "suite": bench_suite,
+    "startup": bench_startup,
+}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=200, help="synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--paragraph-words", type=int, default=200)
+    parser.add_argument("--output", help="write suite results to this JSON file")
+    parser.add_argument("--compare", help="compare suite results against this JSON file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="allowed slowdown per stage before --compare fails",
+    )
+    args = parser.parse_args(argv)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+import os
+from collections import OrderedDict
+
+from htmlnode import RawNode
+
+# Bump whenever block rendering changes so on-disk entries from older
+# builds are never served.
+CACHE_VERSION = 1
+
+
+class BlockCache:
+
+    def __init__(self, maxsize=4096, path=None) -> None:
+        self.enabled = False
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.pending = {}
+        self._db = None
+        self._pid = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def drain_counters(self):
+        counters = {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+        self.reset_counters()
+        return counters
+
+    def merge_counters(self, counters):
+        self.hits += counters["hits"]
+        self.disk_hits += counters["disk_hits"]
+        self.misses += counters["misses"]
+
+    def key(self, block):
+        import hashlib
+
+        return hashlib.blake2b(
+            f"{CACHE_VERSION}\0{block}".encode(), digest_size=16
+        ).hexdigest()
+
+    def _connection(self):
+        if self.path is None:
+            return None
+        # sqlite connections must not cross a fork, so worker processes open
+        # their own.
+        if self._pid != os.getpid():
+            import sqlite3
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks (key TEXT PRIMARY KEY, html TEXT)"
+            )
+            self._pid = os.getpid()
+            self.pending = {}
+        return self._db
+
+    def _remember(self, key, html):
+        self.entries[key] = html
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+        db = self._connection()
+        if db is not None:
+            row = db.execute("SELECT html FROM blocks WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, html):
+        self._remember(key, html)
+        if self.path is not None:
+            self.pending[key] = html
+
+    def render(self, block, render_block):
+        key = self.key(block)
+        html = self.get(key)
+        if html is None:
+            html = render_block(block).to_html()
+            self.put(key, html)
+        return RawNode(html)
+
+    def flush(self):
+        if not self.pending:
+            return
+        db = self._connection()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO blocks (key, html) VALUES (?, ?)",
+                self.pending.items(),
+            )
+        self.pending = {}
+
+    def clear(self):
+        self.entries.clear()
+        self.pending = {}
+        db = self._connection()
+        if db is not None:
+            with db:
+                db.execute("DELETE FROM blocks")
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return (
+            f"Block cache: {self.hits} hits ({self.disk_hits} from disk), "
+            f"{self.misses} misses, {rate:.0%} hit rate"
+        )
+
+
+BLOCK_CACHE = BlockCache()
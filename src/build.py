@@ -0,0 +1,289 @@
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from assets import file_hash, remove_output, source_entry, sync_assets
+from astcache import AST_CACHE
+from blockcache import BLOCK_CACHE
+from catalog import CATALOG
+from depgraph import DependencyGraph, new_page_info, page_url
+from main import collect_pages, generate_page
+from profiler import PROFILER
+from resolve import LINK_RESOLVER
+from search import SearchIndex, start_terms
+
+MANIFEST_VERSION = 1
+PAGE_KEYS = ("hash", "template", "template_hash", "output")
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "pages": {}, "static": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "pages": {}, "static": {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Features are switched on by setting attributes on these module-level
+# objects. Workers started with spawn or forkserver import fresh copies, so
+# the parent's settings are handed to each worker when the pool starts.
+WORKER_SETTINGS = (
+    (PROFILER, ("enabled", "profile_page", "profile_path")),
+    (BLOCK_CACHE, ("enabled", "maxsize", "path")),
+    (AST_CACHE, ("enabled", "directory")),
+    (LINK_RESOLVER, ("enabled", "dest_dir")),
+    (CATALOG, ("enabled", "site_url")),
+)
+
+
+def worker_settings():
+    return [
+        {name: getattr(feature, name) for name in names}
+        for feature, names in WORKER_SETTINGS
+    ]
+
+
+def init_worker(settings):
+    for (feature, _), values in zip(WORKER_SETTINGS, settings):
+        for name, value in values.items():
+            setattr(feature, name, value)
+
+
+def _generate_page_safe(page, collect_info=False, search=False):
+    from_path, template_path, dest_path = page
+    error = None
+    info = new_page_info() if collect_info else None
+    if search:
+        start_terms(info)
+    try:
+        generate_page(from_path, template_path, dest_path, info)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        info = None
+    # Worker processes hand their timings and cache counters back to the
+    # parent process.
+    stats = {
+        "profile": PROFILER.drain() if PROFILER.enabled else None,
+        "cache": BLOCK_CACHE.drain_counters() if BLOCK_CACHE.enabled else None,
+        "ast": AST_CACHE.drain_counters() if AST_CACHE.enabled else None,
+        "links": LINK_RESOLVER.drain() if LINK_RESOLVER.enabled else None,
+        "catalog": CATALOG.drain() if CATALOG.enabled else None,
+    }
+    return from_path, error, stats, info
+
+
+def generate_pages(pages, workers=1, io_workers=0, page_info=None, search=False):
+    if io_workers:
+        if workers > 1:
+            raise ValueError("io_workers renders on one thread and cannot use workers")
+        from pipeline import generate_pages_pipelined
+
+        return generate_pages_pipelined(
+            pages, io_workers, page_info=page_info, search=search
+        )
+    for _, _, dest_path in pages:
+        os.makedirs(dest_path, exist_ok=True)
+    render = functools.partial(
+        _generate_page_safe, collect_info=page_info is not None, search=search
+    )
+    if workers <= 1 or len(pages) <= 1:
+        results = [render(page) for page in pages]
+    else:
+        chunksize = max(1, len(pages) // (workers * 4))
+        # Forked workers start with a copy of the profiler and cache counters,
+        # so empty them first to keep what was recorded so far from being
+        # counted once per worker.
+        recorded = PROFILER.drain()
+        counters = BLOCK_CACHE.drain_counters()
+        ast_counters = AST_CACHE.drain_counters()
+        targets = LINK_RESOLVER.drain()
+        catalog_pages = CATALOG.drain()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(worker_settings(),)
+        ) as pool:
+            results = list(pool.map(render, pages, chunksize=chunksize))
+        PROFILER.merge(recorded)
+        BLOCK_CACHE.merge_counters(counters)
+        AST_CACHE.merge_counters(ast_counters)
+        LINK_RESOLVER.merge(targets)
+        CATALOG.merge(catalog_pages)
+    failures = []
+    for from_path, error, stats, info in results:
+        if info is not None:
+            page_info[from_path] = info
+        if stats["profile"] is not None:
+            PROFILER.merge(stats["profile"])
+        if stats["cache"] is not None:
+            BLOCK_CACHE.merge_counters(stats["cache"])
+        if stats["ast"] is not None:
+            AST_CACHE.merge_counters(stats["ast"])
+        if stats["links"] is not None:
+            LINK_RESOLVER.merge(stats["links"])
+        if stats["catalog"] is not None:
+            CATALOG.merge(stats["catalog"])
+        if error is not None:
+            failures.append((from_path, error))
+    for from_path, error in failures:
+        print(f"Failed to generate {from_path}: {error}")
+    return failures
+
+
+def page_output(dest_path):
+    return os.path.join(dest_path, "index.html")
+
+
+def graph_path(manifest_path):
+    return os.path.join(os.path.dirname(manifest_path), "depgraph.json")
+
+
+def asset_urls(static_entries):
+    return {"/" + rel_path.replace(os.sep, "/") for rel_path in static_entries}
+
+
+def report_broken_links(manifest_path):
+    graph = DependencyGraph.load(graph_path(manifest_path))
+    broken = graph.broken_links(asset_urls(load_manifest(manifest_path)["static"]))
+    for source, target in broken:
+        print(f"Broken link in {source}: {target}")
+    print(f"Broken links: {len(broken)} in {len({source for source, _ in broken})} pages")
+    return broken
+
+
+def search_path(manifest_path):
+    return os.path.join(os.path.dirname(manifest_path), "search.json")
+
+
+def catalog_path(manifest_path):
+    return os.path.join(os.path.dirname(manifest_path), "catalog.json")
+
+
+def build_incremental(
+    content_dir, template_path, static_dir, dest_dir, manifest_path, workers=1,
+    asset_mode="copy", asset_compare="mtime", io_workers=0, search=False,
+):
+    manifest = load_manifest(manifest_path)
+    graph = DependencyGraph.load(graph_path(manifest_path))
+    index = SearchIndex.load(search_path(manifest_path)) if search else None
+    if CATALOG.enabled:
+        CATALOG.load(catalog_path(manifest_path))
+    os.makedirs(dest_dir, exist_ok=True)
+    previous_static = manifest["static"]
+    manifest["static"] = sync_assets(
+        static_dir, dest_dir, previous_static, asset_mode, asset_compare
+    )
+
+    template_hashes = {}
+    previous_pages = manifest["pages"]
+    pages = {}
+    stale = []
+    for from_path, page_template, dest_path in collect_pages(
+        content_dir, template_path, dest_dir
+    ):
+        if page_template not in template_hashes:
+            template_hashes[page_template] = file_hash(page_template)
+        previous = previous_pages.get(from_path)
+        entry = source_entry(from_path, previous)
+        entry["template"] = page_template
+        entry["template_hash"] = template_hashes[page_template]
+        entry["output"] = page_output(dest_path)
+        if (
+            previous is None
+            or any(previous.get(key) != entry[key] for key in PAGE_KEYS)
+            or not os.path.exists(entry["output"])
+            or from_path not in graph.pages
+            or (index is not None and from_path not in index.pages)
+            or (CATALOG.enabled and from_path not in CATALOG.pages)
+        ):
+            stale.append((from_path, page_template, dest_path))
+        pages[from_path] = entry
+
+    unchanged = len(pages) - len(stale)
+    page_info = {}
+    failures = generate_pages(stale, workers, io_workers, page_info, search)
+    failed = {from_path for from_path, _ in failures}
+    generated = len(stale) - len(failures)
+    for from_path, _, dest_path in stale:
+        if from_path in page_info:
+            info = page_info[from_path]
+            url = page_url(dest_path, dest_dir)
+            graph.update(from_path, url, info)
+            if index is not None:
+                index.update(from_path, url, info["title"], info)
+
+    outputs = {entry["output"] for entry in pages.values()}
+    removed = 0
+    removed_urls = [
+        graph.pages[from_path]["url"]
+        for from_path in previous_pages
+        if from_path not in pages and from_path in graph.pages
+    ]
+    for from_path, entry in previous_pages.items():
+        if from_path not in pages and entry["output"] not in outputs:
+            remove_output(entry["output"], dest_dir)
+            removed += 1
+    for from_path in failed:
+        if from_path in previous_pages:
+            pages[from_path] = previous_pages[from_path]
+        else:
+            del pages[from_path]
+    manifest["pages"] = pages
+    save_manifest(manifest, manifest_path)
+
+    # Only the pages that point at a deleted or renamed page or asset need
+    # looking at; everything else keeps its edges from the previous run.
+    for from_path in list(graph.pages):
+        if from_path not in pages:
+            graph.remove(from_path)
+    existing = (
+        {entry["url"] for entry in graph.pages.values()} | asset_urls(manifest["static"])
+    )
+    vanished = [
+        url for url in asset_urls(previous_static) | set(removed_urls) if url not in existing
+    ]
+    for source in graph.dependents(vanished):
+        entry = graph.pages[source]
+        for target in sorted(set(vanished).intersection(entry["links"] + entry["images"])):
+            print(f"Broken link in {source}: {target} was removed")
+    graph.save(graph_path(manifest_path))
+    if LINK_RESOLVER.enabled:
+        # Pages that were not rendered this run keep the targets the graph
+        # recorded for them, so the report covers the whole site every build.
+        LINK_RESOLVER.merge({
+            source: {"links": set(entry["links"]), "images": set(entry["images"])}
+            for source, entry in graph.pages.items()
+            if source not in page_info
+        })
+
+    if index is not None:
+        for from_path in list(index.pages):
+            if from_path not in pages:
+                index.remove(from_path)
+        index.write(dest_dir)
+        index.save(search_path(manifest_path))
+
+    if CATALOG.enabled:
+        # Unchanged pages keep the metadata recorded when they were last
+        # rendered, so no source is read just for the catalog.
+        CATALOG.update(dest_dir, set(pages))
+        CATALOG.write(dest_dir)
+        CATALOG.save(catalog_path(manifest_path))
+
+    print(
+        f"Pages: {generated} generated, {unchanged} unchanged, "
+        f"{removed} removed, {len(failures)} failed"
+    )
+    return failures
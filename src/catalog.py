@@ -0,0 +1,249 @@
+import os
+import posixpath
+
+from assets import file_hash, remove_output
+from depgraph import page_url
+from htmlnode import LeafNode, ParentNode
+
+CATALOG_VERSION = 1
+SITEMAP = "sitemap.xml"
+FEED = "feed.xml"
+FEED_LIMIT = 20
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def parent_url(url):
+    return None if url == "/" else posixpath.dirname(url)
+
+
+def _output_path(dest_dir, url):
+    return os.path.join(dest_dir, *url.strip("/").split("/"), "index.html")
+
+
+def newest_first(entries):
+    # Newest first, undated pages last, ties by title.
+    entries = sorted(entries, key=lambda entry: entry["title"])
+    entries.sort(key=lambda entry: entry["date"] or "", reverse=True)
+    return entries
+
+
+class SiteCatalog:
+
+    def __init__(self, pages=None, listings=None, site_url="") -> None:
+        self.enabled = False
+        # source path -> {"url", "template", "title", "date", "tags"}
+        self.pages = pages if pages is not None else {}
+        # listing URL -> hash of the template it was rendered with
+        self.listings = listings if listings is not None else {}
+        self.site_url = site_url
+        # Pages rendered in this process since the last drain, keyed by
+        # source path, still holding their output directory.
+        self.recorded = {}
+        self.dirty = set()
+        self.changed = False
+
+    def load(self, path):
+        import json
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CATALOG_VERSION:
+            return
+        self.pages, self.listings = data["pages"], data["listings"]
+        if data["site_url"] != self.site_url:
+            self.changed = True
+
+    def save(self, path):
+        import json
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "version": CATALOG_VERSION, "site_url": self.site_url,
+                    "pages": self.pages, "listings": self.listings,
+                },
+                f, separators=(",", ":"),
+            )
+
+    def record(self, from_path, template_path, dest_path, title, meta):
+        self.recorded[from_path] = {
+            "dest": dest_path,
+            "template": template_path,
+            "title": title.strip(),
+            "date": meta.get("date"),
+            "tags": meta.get("tags", []),
+        }
+
+    def drain(self):
+        recorded = self.recorded
+        self.recorded = {}
+        return recorded
+
+    def merge(self, recorded):
+        self.recorded.update(recorded)
+
+    def _touch(self, entry):
+        if entry is not None:
+            self.dirty.add(parent_url(entry["url"]))
+            self.changed = True
+
+    def update(self, dest_dir, sources=None):
+        # Folds this build's pages into the catalog; with sources, pages that
+        # no longer exist are dropped too.
+        for from_path, recorded in self.drain().items():
+            entry = {key: value for key, value in recorded.items() if key != "dest"}
+            entry["url"] = page_url(recorded["dest"], dest_dir)
+            previous = self.pages.get(from_path)
+            if previous != entry:
+                self._touch(previous)
+                self.pages[from_path] = entry
+                self._touch(entry)
+        if sources is not None:
+            for from_path in list(self.pages):
+                if from_path not in sources:
+                    self._touch(self.pages.pop(from_path))
+
+    def children(self):
+        urls = {entry["url"] for entry in self.pages.values()}
+        children = {}
+        for entry in self.pages.values():
+            parent = parent_url(entry["url"])
+            # A directory with its own index page keeps it; listings only
+            # fill in the ones without.
+            if parent is not None and parent not in urls:
+                children.setdefault(parent, []).append(entry)
+        # A listing is an entry of its own parent, so directories that only
+        # hold directories are listed as well.
+        pending = list(children)
+        while pending:
+            url = pending.pop()
+            parent = parent_url(url)
+            if parent is None or parent in urls:
+                continue
+            if parent not in children:
+                pending.append(parent)
+            children.setdefault(parent, []).append({
+                "url": url,
+                "template": children[url][0]["template"],
+                "title": posixpath.basename(url) + "/",
+                "date": None,
+                "tags": [],
+            })
+        return children
+
+    def listing(self, url, entries):
+        from template import load_template
+
+        items = []
+        for entry in newest_first(entries):
+            item = [LeafNode(entry["title"], "a", {"href": entry["url"]})]
+            if entry["date"] is not None:
+                item.append(LeafNode(" "))
+                item.append(LeafNode(entry["date"], "time", {"datetime": entry["date"]}))
+            items.append(ParentNode("li", item))
+        title = f"Index of {url}"
+        content = ParentNode("div", [LeafNode(title, "h1"), ParentNode("ul", items)])
+        template = load_template(entries[0]["template"])
+        return template.render({"Title": title, "Content": content})
+
+    def sitemap(self, listings):
+        from xml.sax.saxutils import escape
+
+        lastmod = {entry["url"]: entry["date"] for entry in self.pages.values()}
+        lastmod.update((url, None) for url in listings)
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<urlset xmlns="{SITEMAP_NS}">',
+        ]
+        for url in sorted(lastmod):
+            date = lastmod[url]
+            modified = f"<lastmod>{date}</lastmod>" if date is not None else ""
+            lines.append(f"<url><loc>{escape(self.site_url + url)}</loc>{modified}</url>")
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def feed(self):
+        from datetime import date, datetime, timezone
+        from email.utils import format_datetime
+        from xml.sax.saxutils import escape
+
+        home = next((entry for entry in self.pages.values() if entry["url"] == "/"), None)
+        title = escape(home["title"] if home is not None else self.site_url or "Feed")
+        dated = newest_first(
+            entry for entry in self.pages.values() if entry["date"] is not None
+        )
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss version="2.0"><channel>',
+            f"<title>{title}</title><link>{escape(self.site_url)}/</link>"
+            f"<description>{title}</description>",
+        ]
+        for entry in dated[:FEED_LIMIT]:
+            link = escape(self.site_url + entry["url"])
+            published = datetime.combine(
+                date.fromisoformat(entry["date"]), datetime.min.time(), timezone.utc
+            )
+            categories = "".join(f"<category>{escape(tag)}</category>" for tag in entry["tags"])
+            lines.append(
+                f"<item><title>{escape(entry['title'])}</title><link>{link}</link>"
+                f"<guid>{link}</guid><pubDate>{format_datetime(published)}</pubDate>"
+                f"{categories}</item>"
+            )
+        lines.append("</channel></rss>")
+        return "\n".join(lines) + "\n"
+
+    def write(self, dest_dir):
+        children = self.children()
+        template_hashes = {}
+        listings = {}
+        written = 0
+        for url in children.keys() ^ self.listings.keys():
+            # Listings appearing or going away change their parent's listing.
+            if parent_url(url) is not None:
+                self.dirty.add(parent_url(url))
+        for url, entries in sorted(children.items()):
+            template_path = entries[0]["template"]
+            if template_path not in template_hashes:
+                template_hashes[template_path] = file_hash(template_path)
+            listings[url] = template_hashes[template_path]
+            path = _output_path(dest_dir, url)
+            if (
+                url in self.dirty
+                or self.listings.get(url) != listings[url]
+                or not os.path.exists(path)
+            ):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    f.write(self.listing(url, entries))
+                written += 1
+        page_urls = {entry["url"] for entry in self.pages.values()}
+        for url in self.listings:
+            # A listing replaced by a real index page leaves that page alone.
+            if url not in listings and url not in page_urls:
+                remove_output(_output_path(dest_dir, url), dest_dir)
+        if listings != self.listings:
+            self.changed = True
+        self.listings = listings
+
+        for name, render in ((SITEMAP, lambda: self.sitemap(listings)), (FEED, self.feed)):
+            path = os.path.join(dest_dir, name)
+            if self.changed or not os.path.exists(path):
+                with open(path, "w") as f:
+                    f.write(render())
+                written += 1
+        self.dirty = set()
+        self.changed = False
+        print(
+            f"Catalog: {len(self.pages)} pages, {len(listings)} listings, "
+            f"{written} files written"
+        )
+        return written
+
+
+CATALOG = SiteCatalog()
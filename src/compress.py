@@ -0,0 +1,121 @@
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from assets import STATE_DIR, load_state, save_state, state_path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".map")
+MIN_SIZE = 1024
+# Lists the compressed files this stage wrote, so only those are ever
+# removed; a .gz or .br that came from static/ is left alone.
+COMPRESS_MANIFEST = "compress-manifest.json"
+
+
+def available_formats():
+    if brotli is None:
+        return ("gz",)
+    return ("gz", "br")
+
+
+def _compress(data, fmt):
+    if fmt == "gz":
+        # A fixed mtime keeps the .gz output identical between builds.
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def compress_file(job):
+    path, formats = job
+    source_mtime = os.stat(path).st_mtime_ns
+    with open(path, "rb") as f:
+        data = None
+        result = {"path": path, "saved": {}, "written": 0, "skipped": 0, "outputs": []}
+        for fmt in formats:
+            target = f"{path}.{fmt}"
+            try:
+                target_stat = os.stat(target)
+            except FileNotFoundError:
+                target_stat = None
+            if target_stat is not None and target_stat.st_mtime_ns >= source_mtime:
+                result["skipped"] += 1
+                result["saved"][fmt] = os.fstat(f.fileno()).st_size - target_stat.st_size
+                result["outputs"].append(target)
+                continue
+            if data is None:
+                data = f.read()
+            compressed = _compress(data, fmt)
+            if len(compressed) >= len(data):
+                if target_stat is not None:
+                    os.remove(target)
+                continue
+            tmp_path = target + ".tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(compressed)
+            os.replace(tmp_path, target)
+            result["written"] += 1
+            result["saved"][fmt] = len(data) - len(compressed)
+            result["outputs"].append(target)
+    return result
+
+
+def load_compress_manifest(path):
+    return set(load_state(path) or ())
+
+
+def compress_outputs(
+    dest_dir, workers=None, min_size=MIN_SIZE, formats=None, state_dir=STATE_DIR,
+):
+    formats = available_formats() if formats is None else formats
+    suffixes = tuple(f".{fmt}" for fmt in ("gz", "br"))
+    manifest_path = state_path(dest_dir, COMPRESS_MANIFEST, state_dir)
+    previous = load_compress_manifest(manifest_path)
+    jobs = []
+    for root, _, files in os.walk(dest_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(suffixes):
+                continue
+            if name.endswith(COMPRESSIBLE) and os.path.getsize(path) >= min_size:
+                jobs.append((path, formats))
+    if workers == 1 or len(jobs) <= 1:
+        results = [compress_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(compress_file, jobs, chunksize=16))
+    produced = {
+        os.path.relpath(target, dest_dir).replace(os.sep, "/")
+        for result in results
+        for target in result["outputs"]
+    }
+    # Outputs whose source was removed, shrank below min_size or stopped
+    # compressing well.
+    removed = 0
+    for rel_path in previous - produced:
+        path = os.path.join(dest_dir, *rel_path.split("/"))
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    save_state(manifest_path, sorted(produced))
+    totals = {
+        "files": len(jobs),
+        "written": sum(result["written"] for result in results),
+        "skipped": sum(result["skipped"] for result in results),
+        "saved": {
+            fmt: sum(result["saved"].get(fmt, 0) for result in results) for fmt in formats
+        },
+        "removed": removed,
+    }
+    saved = ", ".join(
+        f"{fmt} {size / 1024:.1f} KiB" for fmt, size in totals["saved"].items()
+    )
+    print(
+        f"Compressed {totals['files']} files: {totals['written']} written, "
+        f"{totals['skipped']} up to date, {totals['removed']} stale removed; "
+        f"saved {saved}"
+    )
+    return totals
@@ -0,0 +1,94 @@
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron who "
+    "sought dominion over middle earth elves dwarves and men gathered in "
+    "rivendell where elrond held council and the fellowship set out south"
+).split()
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def inline_text(rng, words, link_rate=0.1, emphasis_rate=0.1):
+    parts = []
+    for i in range(words):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < link_rate:
+            parts.append(f"[{word}](/{rng.choice(WORDS)}/{i})")
+        elif roll < link_rate + emphasis_rate:
+            parts.append(rng.choice((f"**{word}**", f"*{word}*", f"`{word}`")))
+        elif roll < link_rate + emphasis_rate + 0.01:
+            parts.append(f"![{word}](/images/{word}.png)")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def code_block(rng, lines):
+    body = "\n".join(
+        f"    {rng.choice(WORDS)}({rng.choice(WORDS)}, {i})" for i in range(lines)
+    )
+    return f"```\n{body}\n```"
+
+
+def random_block(rng, options):
+    kind = rng.random()
+    if kind < 0.1:
+        return "#" * rng.randint(2, 6) + " " + sentence(rng, rng.randint(2, 8))
+    if kind < 0.2:
+        return code_block(rng, rng.randint(3, options["code_lines"]))
+    if kind < 0.3:
+        return "\n".join(
+            f"> {sentence(rng, rng.randint(4, 12))}" for _ in range(rng.randint(1, 4))
+        )
+    if kind < 0.4:
+        marker = rng.choice(("* ", "- "))
+        return "\n".join(
+            marker + inline_text(rng, rng.randint(3, 12), options["link_rate"],
+                                 options["emphasis_rate"])
+            for _ in range(rng.randint(2, 8))
+        )
+    if kind < 0.5:
+        return "\n".join(
+            f"{i}. " + inline_text(rng, rng.randint(3, 12), options["link_rate"],
+                                   options["emphasis_rate"])
+            for i in range(1, rng.randint(3, 10))
+        )
+    return inline_text(
+        rng, rng.randint(20, options["paragraph_words"]), options["link_rate"],
+        options["emphasis_rate"],
+    )
+
+
+def random_page(rng, title, blocks=30, paragraph_words=200, code_lines=40,
+                link_rate=0.1, emphasis_rate=0.1):
+    options = {
+        "paragraph_words": paragraph_words,
+        "code_lines": code_lines,
+        "link_rate": link_rate,
+        "emphasis_rate": emphasis_rate,
+    }
+    parts = [f"# {title}"]
+    for _ in range(blocks):
+        parts.append(random_block(rng, options))
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(root, pages=100, seed=0, depth=3, fanout=4, **page_options):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(pages):
+        directory = root
+        for _ in range(rng.randint(0, depth)):
+            directory = os.path.join(directory, f"section{rng.randrange(fanout)}")
+        directory = os.path.join(directory, f"page{i}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "index.md")
+        with open(path, "w") as f:
+            f.write(random_page(rng, f"Page {i}", **page_options))
+        paths.append(path)
+    return paths
@@ -0,0 +1,247 @@
+import json
+import os
+import socket
+import socketserver
+import time
+
+from assets import copy_file, remove_output
+from build import build_incremental, page_output
+from htmlnode import ParentNode
+from main import block_to_html_node, collect_pages, markdown_to_blocks, read_page
+from template import TEMPLATE_NAME, load_template
+from watch import changed_paths, snapshot
+
+SOCKET_PATH = ".build/daemon.sock"
+
+
+def _inside(path, directory):
+    return path == directory or path.startswith(directory + os.sep)
+
+
+class BuildDaemon:
+
+    def __init__(
+        self, content_dir, template_path, static_dir, dest_dir, manifest_path,
+        asset_mode="copy",
+    ) -> None:
+        self.content_dir = os.path.normpath(content_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.static_dir = os.path.normpath(static_dir)
+        self.dest_dir = dest_dir
+        self.manifest_path = manifest_path
+        self.asset_mode = asset_mode
+        self.stopped = False
+        # source path -> (template path, destination directory)
+        self.pages = {}
+        # source path -> {block text: rendered node}
+        self.trees = {}
+        self.state = {}
+
+    def start(self):
+        # A regular incremental build brings public/ and the manifest up to
+        # date; after that every request only touches what it names.
+        build_incremental(
+            self.content_dir, self.template_path, self.static_dir, self.dest_dir,
+            self.manifest_path, asset_mode=self.asset_mode,
+        )
+        self.scan()
+        self.state = snapshot([self.content_dir, self.static_dir, self.template_path])
+        for from_path in self.pages:
+            self.parse(from_path)
+
+    def scan(self):
+        self.pages = {
+            from_path: (template_path, dest_path)
+            for from_path, template_path, dest_path in collect_pages(
+                self.content_dir, self.template_path, self.dest_dir
+            )
+        }
+        for from_path in list(self.trees):
+            if from_path not in self.pages:
+                del self.trees[from_path]
+
+    def parse(self, from_path):
+        title, content, _ = read_page(from_path)
+        blocks = markdown_to_blocks(content)
+        # Only blocks whose text changed since the last parse are rendered.
+        previous = self.trees.get(from_path, {})
+        tree = {}
+        for block in blocks:
+            if block not in tree:
+                node = previous.get(block)
+                tree[block] = node if node is not None else block_to_html_node(block)
+        self.trees[from_path] = tree
+        return title, [tree[block] for block in blocks]
+
+    def render(self, from_path):
+        template_path, dest_path = self.pages[from_path]
+        title, nodes = self.parse(from_path)
+        template = load_template(template_path)
+        values = {"Title": title, "Content": ParentNode("div", nodes, None)}
+        template.check(values)
+        os.makedirs(dest_path, exist_ok=True)
+        with open(os.path.join(dest_path, "index.html"), "w") as w:
+            template.write(w, values)
+
+    def local_path(self, path):
+        # Clients send absolute paths; pages are keyed the way collect_pages
+        # spells them for the directories the daemon was started with.
+        path = os.path.abspath(path)
+        return path if os.path.isabs(self.content_dir) else os.path.relpath(path)
+
+    def expand(self, paths):
+        # A directory stands for every file under it, plus the pages and
+        # assets the daemon knew there that have since been deleted.
+        expanded = set()
+        for path in paths:
+            known = {
+                known for known in (*self.pages, *self.state)
+                if known != path and _inside(known, path)
+            }
+            if os.path.isdir(path):
+                expanded.update(snapshot([path]))
+            elif not known:
+                expanded.add(path)
+            expanded.update(known)
+        return expanded
+
+    def sync_asset(self, path):
+        dest = os.path.join(self.dest_dir, os.path.relpath(path, self.static_dir))
+        if os.path.isfile(path):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            copy_file(path, dest, self.asset_mode)
+        else:
+            remove_output(dest, self.dest_dir)
+
+    def rebuild(self, paths=None):
+        start = time.perf_counter()
+        if paths is None:
+            state = snapshot([self.content_dir, self.static_dir, self.template_path])
+            paths = changed_paths(self.state, state)
+            self.state = state
+        paths = self.expand({self.local_path(path) for path in paths})
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.state.pop(path, None)
+            else:
+                self.state[path] = (stat.st_mtime_ns, stat.st_size)
+
+        previous_pages = self.pages
+        if any(
+            path not in self.pages or os.path.basename(path) == TEMPLATE_NAME
+            or not os.path.exists(path)
+            for path in paths if _inside(path, self.content_dir)
+        ) or self.template_path in paths:
+            self.scan()
+
+        stale = set()
+        assets = 0
+        for path in paths:
+            if _inside(path, self.static_dir):
+                self.sync_asset(path)
+                assets += 1
+            elif path == self.template_path or os.path.basename(path) == TEMPLATE_NAME:
+                stale.update(
+                    from_path for from_path, page in self.pages.items() if page[0] == path
+                )
+            elif path in self.pages:
+                stale.add(path)
+
+        removed = []
+        outputs = {page_output(dest_path) for _, dest_path in self.pages.values()}
+        for from_path in sorted(set(previous_pages) - set(self.pages)):
+            output = page_output(previous_pages[from_path][1])
+            if output not in outputs:
+                remove_output(output, self.dest_dir)
+            removed.append(from_path)
+
+        generated = []
+        failures = []
+        for from_path in sorted(stale):
+            try:
+                self.render(from_path)
+            except Exception as e:
+                failures.append([from_path, f"{type(e).__name__}: {e}"])
+            else:
+                generated.append(from_path)
+        return {
+            "ok": not failures,
+            "generated": generated,
+            "removed": removed,
+            "assets": assets,
+            "failures": failures,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def status(self):
+        return {
+            "ok": True,
+            "pages": len(self.pages),
+            "parsed": len(self.trees),
+            "blocks": sum(len(tree) for tree in self.trees.values()),
+        }
+
+    def handle(self, request):
+        command = request.get("command")
+        if command == "rebuild":
+            return self.rebuild(request.get("paths"))
+        if command == "status":
+            return self.status()
+        if command == "shutdown":
+            self.stopped = True
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown command: {command}"}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.daemon.handle(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            if self.server.daemon.stopped:
+                return
+
+
+def send_request(request, socket_path=SOCKET_PATH):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def _claim_socket(socket_path):
+    if not os.path.exists(socket_path):
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return
+    try:
+        send_request({"command": "status"}, socket_path)
+    except (ConnectionError, OSError):
+        # Left behind by a daemon that did not shut down cleanly.
+        os.remove(socket_path)
+        return
+    raise Exception(f"a build daemon is already listening on {socket_path}")
+
+
+def serve(daemon, socket_path=SOCKET_PATH):
+    _claim_socket(socket_path)
+    daemon.start()
+    server = socketserver.UnixStreamServer(socket_path, _Handler)
+    server.daemon = daemon
+    print(f"Build daemon listening on {socket_path}")
+    try:
+        while not daemon.stopped:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
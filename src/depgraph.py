@@ -0,0 +1,118 @@
+import os
+import posixpath
+import re
+
+from htmlnode import RawNode
+
+RAW_TARGET_RE = re.compile(r'<(a|img) href="([^"]*)"')
+EXTERNAL_PREFIXES = ("http://", "https://", "//", "mailto:", "tel:", "data:", "#")
+GRAPH_VERSION = 1
+
+
+def new_page_info():
+    return {"links": [], "images": []}
+
+
+def record_targets(node, info):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, RawNode):
+            # Blocks served from the render cache only exist as HTML.
+            for tag, url in RAW_TARGET_RE.findall(node.value):
+                info["links" if tag == "a" else "images"].append(url)
+        elif node.children is not None:
+            stack.extend(reversed(node.children))
+        elif node.tag == "a" and node.props:
+            info["links"].append(node.props.get("href"))
+        elif node.tag == "img" and node.props:
+            info["images"].append(node.props.get("href"))
+
+
+def page_url(dest_path, dest_dir):
+    rel_path = os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    return "/" if rel_path == "." else "/" + rel_path
+
+
+def is_internal(target):
+    return bool(target) and not target.startswith(EXTERNAL_PREFIXES)
+
+
+def normalize_url(target, base_url):
+    path = target.split("#", 1)[0].split("?", 1)[0]
+    if not path.startswith("/"):
+        path = posixpath.join(base_url, path)
+    path = posixpath.normpath(path)
+    if path.endswith(".md"):
+        # Every markdown file is rendered to its directory's index.html.
+        path = posixpath.dirname(path)
+    if path.endswith("/index.html"):
+        path = path[: -len("index.html")]
+    if path != "/":
+        path = path.rstrip("/")
+    return path
+
+
+class DependencyGraph:
+
+    def __init__(self, pages=None) -> None:
+        # source path -> {"url": ..., "links": [...], "images": [...]}
+        self.pages = pages if pages is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        import json
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != GRAPH_VERSION:
+            return cls()
+        return cls(data["pages"])
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        import json
+
+        with open(path, "w") as f:
+            json.dump({"version": GRAPH_VERSION, "pages": self.pages}, f, sort_keys=True)
+
+    def update(self, source, url, info):
+        base = url if url.endswith("/") else url + "/"
+        self.pages[source] = {
+            "url": url,
+            "links": sorted({
+                normalize_url(target, base) for target in info["links"] if is_internal(target)
+            }),
+            "images": sorted({
+                normalize_url(target, base) for target in info["images"] if is_internal(target)
+            }),
+        }
+
+    def remove(self, source):
+        self.pages.pop(source, None)
+
+    def urls(self):
+        return {entry["url"] for entry in self.pages.values()}
+
+    def dependents(self, targets):
+        targets = set(targets)
+        return sorted(
+            source
+            for source, entry in self.pages.items()
+            if targets.intersection(entry["links"]) or targets.intersection(entry["images"])
+        )
+
+    def broken_links(self, asset_urls):
+        known = self.urls() | set(asset_urls)
+        broken = []
+        for source, entry in sorted(self.pages.items()):
+            for kind in ("links", "images"):
+                for target in entry[kind]:
+                    if target not in known:
+                        broken.append((source, target))
+        return broken
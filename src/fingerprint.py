@@ -0,0 +1,121 @@
+import json
+import os
+import posixpath
+import re
+
+from assets import (
+    STATE_DIR, copy_file, file_hash, load_state, remove_output, replace_text, save_state,
+    state_path,
+)
+
+ASSET_MANIFEST = "asset-manifest.json"
+HEADERS_FILE = "_headers"
+# page path -> the page's size and mtime after the last rewrite and the
+# assets it references, so untouched pages are not read again.
+PAGES_FILE = "fingerprint-pages.json"
+IMMUTABLE = "Cache-Control: public, max-age=31536000, immutable"
+URL_RE = re.compile(r'(\b(?:href|src)=")([^"#?]*)([^"]*")')
+
+
+def fingerprinted_name(rel_path, digest, length=8):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:length]}{ext}"
+
+
+def load_asset_manifest(dest_dir):
+    try:
+        with open(os.path.join(dest_dir, ASSET_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def rewrite_urls(html, page_dir, lookup, found=None):
+    def replace(match):
+        url = match.group(2)
+        if "://" in url or url.startswith("//") or not url:
+            return match.group(0)
+        if url.startswith("/"):
+            rel_path = url[1:]
+        else:
+            rel_path = posixpath.normpath(posixpath.join(page_dir, url))
+        target = lookup.get(rel_path)
+        if target is None:
+            return match.group(0)
+        if found is not None:
+            found.add(target)
+        return f"{match.group(1)}/{target}{match.group(3)}"
+
+    return URL_RE.sub(replace, html)
+
+
+def fingerprint_assets(static_dir, dest_dir, mode="copy", state_dir=STATE_DIR):
+    previous = load_asset_manifest(dest_dir)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for name in sorted(files):
+            rel_path = os.path.relpath(os.path.join(root, name), static_dir)
+            published = os.path.join(dest_dir, rel_path)
+            url_path = rel_path.replace(os.sep, "/")
+            hashed = fingerprinted_name(url_path, file_hash(published))
+            manifest[url_path] = hashed
+            hashed_path = os.path.join(dest_dir, *hashed.split("/"))
+            if not os.path.exists(hashed_path):
+                copy_file(published, hashed_path, mode)
+
+    for url_path, hashed in previous.items():
+        if manifest.get(url_path) != hashed:
+            remove_output(os.path.join(dest_dir, *hashed.split("/")), dest_dir)
+
+    # Pages built before this run may still point at an older fingerprint.
+    lookup = dict(manifest)
+    for url_path, hashed in previous.items():
+        if url_path in manifest:
+            lookup[hashed] = manifest[url_path]
+
+    # A page needs looking at when it was written since the last run or
+    # points at a fingerprint that has since changed.
+    pages_path = state_path(dest_dir, PAGES_FILE, state_dir)
+    previous_pages = load_state(pages_path) or {}
+    pages = {}
+    rewritten = 0
+    for root, _, files in os.walk(dest_dir):
+        for name in files:
+            if not name.endswith(".html"):
+                continue
+            path = os.path.join(root, name)
+            page_dir = os.path.relpath(root, dest_dir).replace(os.sep, "/")
+            rel_path = os.path.relpath(path, dest_dir).replace(os.sep, "/")
+            stat = os.stat(path)
+            entry = previous_pages.get(rel_path)
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime_ns
+                and all(lookup.get(target, target) == target for target in entry["assets"])
+            ):
+                pages[rel_path] = entry
+                continue
+            with open(path, "r") as f:
+                html = f.read()
+            found = set()
+            updated = rewrite_urls(
+                html, "" if page_dir == "." else page_dir, lookup, found
+            )
+            if updated != html:
+                replace_text(path, updated)
+                rewritten += 1
+                stat = os.stat(path)
+            pages[rel_path] = {
+                "size": stat.st_size, "mtime": stat.st_mtime_ns, "assets": sorted(found),
+            }
+
+    with open(os.path.join(dest_dir, ASSET_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    save_state(pages_path, pages)
+    with open(os.path.join(dest_dir, HEADERS_FILE), "w") as f:
+        for hashed in sorted(manifest.values()):
+            f.write(f"/{hashed}\n  {IMMUTABLE}\n")
+    print(f"Fingerprinted {len(manifest)} assets, rewrote {rewritten} pages")
+    return manifest
@@ -0,0 +1,60 @@
+from io import StringIO
+
+FRONT_MATTER = "---"
+
+
+def parse_front_matter(lines, path=None):
+    meta = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid front matter line {line!r}")
+        key, value = key.strip().lower(), value.strip()
+        if key == "title":
+            meta["title"] = value
+        elif key == "date":
+            from datetime import date
+
+            try:
+                meta["date"] = date.fromisoformat(value).isoformat()
+            except ValueError:
+                # The page still renders; it is just undated.
+                print(f"Invalid date in {path or 'front matter'}: {value!r}")
+        elif key == "tags":
+            tags = value.strip("[]").split(",")
+            meta["tags"] = [tag.strip() for tag in tags if tag.strip()]
+    return meta
+
+
+def _is_meta_line(line):
+    line = line.strip()
+    return not line or line.startswith("#") or ":" in line
+
+
+def read_front_matter(f, path=None):
+    # Leaves f at the first line after the block, or where it started when
+    # the page has none. A leading "---" is only front matter when a closing
+    # "---" follows key: value lines; otherwise it is a thematic break and
+    # the content is left alone.
+    start = f.tell()
+    if f.readline().rstrip("\r\n") == FRONT_MATTER:
+        lines = []
+        for line in iter(f.readline, ""):
+            if line.rstrip("\r\n") == FRONT_MATTER:
+                return parse_front_matter(lines, path)
+            if not _is_meta_line(line):
+                break
+            lines.append(line)
+    f.seek(start)
+    return {}
+
+
+def split_front_matter(content, path=None):
+    if not content.startswith(FRONT_MATTER):
+        return {}, content
+    f = StringIO(content)
+    meta = read_front_matter(f, path)
+    return meta, content[f.tell() :]
@@ -1,7 +1,12 @@
+from sys import intern
+
+
 class HTMLNode:
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None) -> None:
-        self.tag = tag
+        self.tag = intern(tag) if tag is not None else None
         self.value = value
         self.children = children
         self.props = props
@@ -17,6 +22,35 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError()
 
+    def iter_html(self):
+        stack = [(None, iter((self,)))]
+        while stack:
+            closing_tag, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child.check()
+                    yield f"<{child.tag}{child.props_to_html()}>"
+                    stack.append((f"</{child.tag}>", iter(child.children)))
+                    break
+                yield child.to_html()
+            else:
+                stack.pop()
+                if closing_tag is not None:
+                    yield closing_tag
+
+    def write_html(self, sink, buffer_size=1 << 16):
+        buffer = []
+        buffered = 0
+        for fragment in self.iter_html():
+            buffer.append(fragment)
+            buffered += len(fragment)
+            if buffered >= buffer_size:
+                sink.write("".join(buffer))
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            sink.write("".join(buffer))
+
     def props_to_html(self):
         retstring = ""
         if self.props is not None:
@@ -27,6 +61,8 @@ class HTMLNode:
 
 class LeafNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, value, tag=None, props=None, children=None) -> None:
         super().__init__(tag, value, children, props)
 
@@ -48,8 +84,21 @@ class LeafNode(HTMLNode):
             raise ValueError("A Leaf Node does not have Child Nodes")
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+class RawNode(LeafNode):
+
+    __slots__ = ()
+
+    def __init__(self, html) -> None:
+        super().__init__(html)
+
+    def __repr__(self):
+        return f"RawNode({self.value!r})"
+
+
 class ParentNode(HTMLNode):
 
+    __slots__ = ()
+
     def __init__(self, tag, children, value=None, props=None) -> None:
         super().__init__(tag, value, children, props)
 
@@ -65,13 +114,11 @@ class ParentNode(HTMLNode):
             other.tag is not None
         return False
         
-    def to_html(self):
+    def check(self):
         if self.tag is None:
             raise ValueError("Parent Node needs a tag")
         if self.children is None:
             raise ValueError("Parent Node needs children")
-        string_output = f"<{self.tag}>"
-        for child in self.children:
-            string_output += child.to_html()
-        string_output += f"</{self.tag}>"
-        return string_output
+
+    def to_html(self):
+        return "".join(self.iter_html())
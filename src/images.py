@@ -0,0 +1,331 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from assets import (
+    STATE_DIR, copy_file, load_state, remove_output, replace_text, save_state, source_entry,
+    state_path,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_MANIFEST = "image-manifest.json"
+IMAGE_MANIFEST_VERSION = 1
+CACHE_DIR = ".build/images"
+WIDTHS = (480, 960, 1440)
+RESIZABLE = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+WEBP_QUALITY = 80
+# Matches an image tag as text_node_to_html_node writes it, together with
+# the <picture> wrapper and attributes an earlier run may have added.
+IMG_RE = re.compile(
+    r'(?:<picture><source type="image/webp" srcset="[^"]*" sizes="[^"]*">)?'
+    r'<img href="([^"]*)"([^>]*)>(.*?)</img>(?:</picture>)?',
+    re.S,
+)
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        data = f.read(2)
+        if len(data) < 2:
+            return None
+        (length,) = struct.unpack(">H", data)
+        # SOF0..SOF15, except DHT (C4), JPG (C8) and DAC (CC).
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">xHH", data)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    # Reads just enough of the header for width and height, so pages get
+    # their dimensions even where Pillow is not installed.
+    with open(path, "rb") as f:
+        head = f.read(30)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head.startswith(b"\xff\xd8"):
+                return _jpeg_size(f)
+        except struct.error:
+            # Truncated header.
+            return None
+        if len(head) == 30 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                (bits,) = struct.unpack("<I", head[21:25])
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                width = int.from_bytes(head[24:27], "little") + 1
+                height = int.from_bytes(head[27:30], "little") + 1
+                return width, height
+    return None
+
+
+def derivative_name(rel_path, width, ext=None):
+    root, source_ext = posixpath.splitext(rel_path)
+    return f"{root}.{width}w{ext or source_ext}"
+
+
+def make_derivatives(job):
+    # One unreadable image is reported for the pages that use it instead of
+    # stopping the build.
+    try:
+        return _make_derivatives(*job)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _make_derivatives(source, key, widths, webp, cache_dir):
+    directory = os.path.join(cache_dir, key)
+    meta_path = os.path.join(directory, "meta.json")
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    size = image_size(source)
+    if size is None:
+        raise ValueError("unrecognised or truncated image header")
+    meta = {"width": size[0], "height": size[1], "variants": []}
+    if Image is not None:
+        os.makedirs(directory, exist_ok=True)
+        ext = os.path.splitext(source)[1].lower()
+        with Image.open(source) as image:
+            image.load()
+            targets = [width for width in widths if width < image.width]
+            for width in targets:
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS)
+                name = f"{width}{ext}"
+                resized.save(os.path.join(directory, name))
+                meta["variants"].append([width, height, ext, name])
+                if webp:
+                    name = f"{width}.webp"
+                    resized.save(os.path.join(directory, name), "WEBP", quality=WEBP_QUALITY)
+                    meta["variants"].append([width, height, ".webp", name])
+            if webp and ext != ".webp":
+                name = f"{image.width}.webp"
+                image.save(os.path.join(directory, name), "WEBP", quality=WEBP_QUALITY)
+                meta["variants"].append([image.width, image.height, ".webp", name])
+        # Without Pillow nothing is cached, so installing it later still
+        # produces the derivatives.
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    return meta
+
+
+def _srcset(url, entries):
+    return ", ".join(f"{derivative_name(url, width, ext)} {width}w" for width, ext in entries)
+
+
+def image_markup(url, meta, alt, sizes="100vw", base=None):
+    # base is the image's path in static/; srcset is built from it so the
+    # markup is the same whether or not url has been fingerprinted.
+    if meta is None or meta["width"] is None:
+        return f'<img href="{url}">{alt}</img>'
+    base = url if base is None else base
+    resized = [(width, ext) for width, _, ext, _ in meta["variants"] if ext != ".webp"]
+    webp = [(width, ext) for width, _, ext, _ in meta["variants"] if ext == ".webp"]
+    attrs = ""
+    if resized:
+        srcset = _srcset(base, resized) + f", {base} {meta['width']}w"
+        attrs += f' srcset="{srcset}" sizes="{sizes}"'
+    attrs += f' width="{meta["width"]}" height="{meta["height"]}"'
+    img = f'<img href="{url}"{attrs}>{alt}</img>'
+    if not webp:
+        return img
+    return (
+        f'<picture><source type="image/webp" srcset="{_srcset(base, webp)}" '
+        f'sizes="{sizes}">{img}</picture>'
+    )
+
+
+def rewrite_images(html, page_dir, images, aliases=None):
+    def replace(match):
+        url, _, alt = match.groups()
+        rel_path = _static_path(url, page_dir, aliases)
+        meta = images.get(rel_path)
+        if meta is None:
+            # Broken or not a static image: left as it is.
+            return match.group(0)
+        return image_markup(url, meta, alt, base="/" + rel_path)
+
+    return IMG_RE.sub(replace, html)
+
+
+def cache_key(digest, widths, webp):
+    # Derivatives are reused for as long as the source bytes and the
+    # options they were made with stay the same.
+    options = f"{digest}:{','.join(map(str, widths))}:{int(webp)}:{WEBP_QUALITY}"
+    return hashlib.sha256(options.encode()).hexdigest()[:32]
+
+
+def _static_path(url, page_dir, aliases=None):
+    if "://" in url or url.startswith("//") or not url:
+        return None
+    path = url.split("#", 1)[0].split("?", 1)[0]
+    if path.startswith("/"):
+        rel_path = path[1:]
+    else:
+        rel_path = posixpath.normpath(posixpath.join(page_dir, path))
+    # A page --fingerprint already rewrote points at the hashed copy.
+    return aliases.get(rel_path, rel_path) if aliases else rel_path
+
+
+def _pages(dest_dir):
+    for root, _, files in os.walk(dest_dir):
+        for name in files:
+            if name.endswith(".html"):
+                page_dir = os.path.relpath(root, dest_dir).replace(os.sep, "/")
+                yield os.path.join(root, name), "" if page_dir == "." else page_dir
+
+
+def _referenced(html, page_dir, aliases):
+    rel_paths = []
+    for match in IMG_RE.finditer(html):
+        rel_path = _static_path(match.group(1), page_dir, aliases)
+        if rel_path is not None and rel_path.lower().endswith(RESIZABLE):
+            rel_paths.append(rel_path)
+    return rel_paths
+
+
+def process_images(
+    static_dir, dest_dir, workers=None, widths=WIDTHS, webp=False, mode="copy",
+    cache_dir=CACHE_DIR, state_dir=STATE_DIR,
+):
+    from fingerprint import load_asset_manifest
+
+    manifest_path = state_path(dest_dir, IMAGE_MANIFEST, state_dir)
+    previous = load_image_manifest(manifest_path)
+    aliases = {hashed: url_path for url_path, hashed in load_asset_manifest(dest_dir).items()}
+    # Collect every referenced image in one pass over the pages before any
+    # resizing starts, so each source is processed once however many pages
+    # use it. Pages untouched since the last run are not read; the images
+    # they use come from the manifest.
+    pages = {}
+    users = {}
+    for path, page_dir in _pages(dest_dir):
+        rel_page = os.path.relpath(path, dest_dir).replace(os.sep, "/")
+        stat = os.stat(path)
+        entry = previous["pages"].get(rel_page)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime"] == stat.st_mtime_ns
+        ):
+            html, rel_paths = None, list(entry["images"])
+        else:
+            with open(path) as f:
+                html = f.read()
+            rel_paths = _referenced(html, page_dir, aliases)
+        pages[rel_page] = (path, page_dir, html, rel_paths)
+        for rel_path in rel_paths:
+            users.setdefault(rel_path, []).append(rel_page)
+
+    sources = {}
+    keys = {}
+    for rel_path in users:
+        source = os.path.join(static_dir, *rel_path.split("/"))
+        if os.path.isfile(source):
+            # The source hash is only recomputed when mtime or size moved.
+            sources[rel_path] = source_entry(source, previous["sources"].get(rel_path))
+            keys[rel_path] = cache_key(sources[rel_path]["hash"], widths, webp)
+    jobs = [
+        (os.path.join(static_dir, *rel_path.split("/")), key, widths, webp, cache_dir)
+        for rel_path, key in keys.items()
+    ]
+    if workers == 1 or len(jobs) <= 1:
+        results = [make_derivatives(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(make_derivatives, jobs))
+    images = {}
+    broken = []
+    for rel_path, meta in zip(list(keys), results):
+        if "error" in meta:
+            del keys[rel_path]
+            broken.extend((page, rel_path, meta["error"]) for page in users[rel_path])
+        else:
+            images[rel_path] = meta
+
+    published = {}
+    for rel_path, meta in images.items():
+        key = keys[rel_path]
+        for width, _, ext, name in meta["variants"]:
+            target = derivative_name(rel_path, width, ext)
+            published[target] = key
+            dest = os.path.join(dest_dir, *target.split("/"))
+            if previous["derivatives"].get(target) != key or not os.path.exists(dest):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                copy_file(os.path.join(cache_dir, key, name), dest, mode)
+    for target in previous["derivatives"]:
+        if target not in published:
+            remove_output(os.path.join(dest_dir, *target.split("/")), dest_dir)
+
+    page_entries = {}
+    rewritten = 0
+    for rel_page, (path, page_dir, html, rel_paths) in pages.items():
+        entry = previous["pages"].get(rel_page)
+        used = {rel_path: keys.get(rel_path) for rel_path in rel_paths}
+        if html is None and used == entry["images"]:
+            page_entries[rel_page] = entry
+            continue
+        if html is None:
+            with open(path) as f:
+                html = f.read()
+        updated = rewrite_images(html, page_dir, images, aliases)
+        if updated != html:
+            replace_text(path, updated)
+            rewritten += 1
+        stat = os.stat(path)
+        page_entries[rel_page] = {
+            "size": stat.st_size, "mtime": stat.st_mtime_ns, "images": used,
+        }
+
+    save_state(
+        manifest_path,
+        {
+            "version": IMAGE_MANIFEST_VERSION, "derivatives": published,
+            "sources": sources, "pages": page_entries,
+        },
+    )
+    for page, rel_path, error in broken:
+        print(f"Broken image in {page}: /{rel_path} ({error})")
+    note = "" if Image is not None else " (Pillow not installed: sizes only, no derivatives)"
+    print(
+        f"Images: {len(images)} referenced, {len(published)} derivatives, "
+        f"{len(broken)} broken, rewrote {rewritten} pages{note}"
+    )
+    return images
+
+
+def load_image_manifest(path):
+    empty = {"derivatives": {}, "sources": {}, "pages": {}}
+    manifest = load_state(path)
+    if not isinstance(manifest, dict) or manifest.get("version") != IMAGE_MANIFEST_VERSION:
+        return empty
+    return manifest
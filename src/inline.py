@@ -0,0 +1,79 @@
+import re
+
+from textnode import TextNode, TextType
+
+# "**" has to come before "*" so that bold markers are never read as two
+# italic markers, matching the order text_to_textnodes used to split in.
+DELIMITER_RE = re.compile(r"\*\*|\*|`")
+LINK_RE = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+IMAGE_RE = re.compile(r"!\[(.*?)\]\((.*?)\)")
+
+
+def _split_pattern(text, pattern, text_type, nodes, inner=None):
+    position = 0
+    for match in pattern.finditer(text):
+        if match.start() > position:
+            _emit(text[position : match.start()], TextType.NORMAL, nodes, inner)
+        _emit(match.group(1), text_type, nodes, inner, match.group(2))
+        position = match.end()
+    return position
+
+
+def _emit(text, text_type, nodes, inner, url=None):
+    if inner is None or "![" not in text:
+        nodes.append(TextNode(text, text_type, url))
+        return
+    position = _split_pattern(text, inner, TextType.IMAGES, nodes)
+    if position == 0:
+        nodes.append(TextNode(text, text_type, url))
+    elif position < len(text):
+        nodes.append(TextNode(text[position:], TextType.NORMAL))
+
+
+def split_links_and_images(text, text_type, nodes):
+    if "[" not in text:
+        nodes.append(TextNode(text, text_type))
+        return
+    # Links are split out first and images second, like split_nodes_link and
+    # split_nodes_image did, but each pattern only scans the text once.
+    position = _split_pattern(text, LINK_RE, TextType.LINKS, nodes, IMAGE_RE)
+    if position == 0:
+        _emit(text, text_type, nodes, IMAGE_RE)
+    elif position < len(text):
+        _emit(text[position:], TextType.NORMAL, nodes, IMAGE_RE)
+
+
+def _current_type(bold, italic, code):
+    if bold:
+        return TextType.BOLD
+    if italic:
+        return TextType.ITALIC
+    if code:
+        return TextType.CODE
+    return TextType.NORMAL
+
+
+def tokenize_inline(text):
+    nodes = []
+    bold = italic = code = False
+    position = 0
+    for match in DELIMITER_RE.finditer(text):
+        delimiter = match.group()
+        if bold and delimiter != "**":
+            continue
+        if italic and delimiter == "`":
+            continue
+        split_links_and_images(
+            text[position : match.start()], _current_type(bold, italic, code), nodes
+        )
+        position = match.end()
+        if delimiter == "**":
+            bold = not bold
+            italic = code = False
+        elif delimiter == "*":
+            italic = not italic
+            code = False
+        else:
+            code = not code
+    split_links_and_images(text[position:], _current_type(bold, italic, code), nodes)
+    return nodes
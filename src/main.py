@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 
-from collections.abc import Container
-from os.path import isdir
 from textnode import TextNode, TextType
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from frontmatter import read_front_matter, split_front_matter
+from htmlnode import LeafNode, ParentNode
+from inline import IMAGE_RE, LINK_RE, tokenize_inline
+from profiler import PROFILER, timed
+from template import directory_template, load_template
 import re
 import os
-import shutil
-import pathlib
+import sys
 
 block_type_paragraph = "paragraph"
 block_type_heading = "heading"
@@ -16,6 +17,10 @@ block_type_quote = "quote"
 block_type_olist = "ordered_list"
 block_type_ulist = "unordered_list"
 
+# Markdown files at least this large are rendered block by block instead of
+# being read into memory whole.
+STREAM_THRESHOLD = 1 << 20
+
 
 def text_node_to_html_node(text_node):
     match text_node.text_type:
@@ -53,13 +58,11 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_images(text):
-    regex = r"!\[(.*?)\]\((.*?)\)"
-    return re.findall(regex, text)
+    return IMAGE_RE.findall(text)
 
 
 def extract_markdown_links(text):
-    regex = r"(?<!!)\[(.*?)\]\((.*?)\)"
-    return re.findall(regex, text)
+    return LINK_RE.findall(text)
 
 
 def split_nodes_image(old_nodes):
@@ -120,15 +123,11 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
+@timed("text_to_textnodes")
 def text_to_textnodes(text):
-    node = TextNode(text, TextType.NORMAL)
-    nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_image(nodes)
-    return nodes
+    return tokenize_inline(text)
 
+@timed("markdown_to_blocks")
 def markdown_to_blocks(markdown):
     blocks = markdown.split("\n\n")
     filtered_blocks = []
@@ -140,49 +139,143 @@ def markdown_to_blocks(markdown):
     return filtered_blocks
 
 
-def block_to_block_type(block):
+HEADING_RE = re.compile(r"#{1,6} ")
+
+
+_olist_prefixes = []
+
+
+def _olist_prefix(i):
+    while len(_olist_prefixes) <= i:
+        _olist_prefixes.append(f"{len(_olist_prefixes) + 1}. ")
+    return _olist_prefixes[i]
+
+
+def _classify_heading(block):
+    if HEADING_RE.match(block):
+        return block_type_heading, None
+    return block_type_paragraph, None
+
+
+def _classify_code(block):
+    if "\n" in block and block.startswith("```"):
+        if block.startswith("```", block.rfind("\n") + 1):
+            return block_type_code, None
+    return block_type_paragraph, None
+
+
+def _classify_quote(block):
+    if block.count("\n>") == block.count("\n"):
+        return block_type_quote, block.split("\n")
+    return block_type_paragraph, None
+
+
+def _classify_ulist(block):
+    marker = "\n" + block[:2]
+    if block[1:2] == " " and block.count(marker) == block.count("\n"):
+        return block_type_ulist, block.split("\n")
+    return block_type_paragraph, None
+
+
+def _classify_olist(block):
+    if not block.startswith("1. "):
+        return block_type_paragraph, None
     lines = block.split("\n")
+    for i, line in enumerate(lines):
+        if not line.startswith(_olist_prefix(i)):
+            return block_type_paragraph, None
+    return block_type_olist, lines
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-        return block_type_heading
-    if (
-        len(lines) > 1
-        and lines[0].startswith("```")
-        and lines[-1].startswith("```")
-    ):
-        return block_type_code
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return block_type_paragraph
-        return block_type_quote
-    if block.startswith("* "):
-        for line in lines:
-            if not line.startswith("* "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return block_type_paragraph
-            i += 1
-        return block_type_olist
-    return block_type_paragraph
-
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children = []
+
+# Only the first character decides which block types are possible at all,
+# so each block is checked against at most one candidate type.
+BLOCK_CLASSIFIERS = {
+    "#": _classify_heading,
+    "`": _classify_code,
+    ">": _classify_quote,
+    "*": _classify_ulist,
+    "-": _classify_ulist,
+    "1": _classify_olist,
+}
+
+
+@timed("classify_block")
+def classify_block(block):
+    classifier = BLOCK_CLASSIFIERS.get(block[:1])
+    if classifier is None:
+        return block_type_paragraph, None
+    return classifier(block)
+
+
+def block_to_block_type(block):
+    return classify_block(block)[0]
+
+
+def iter_markdown_blocks(f, chunk_size=1 << 16):
+    # The block being read is kept as a list of pieces and joined once, and
+    # only the new chunk is searched, so a block spanning many chunks costs
+    # linear time rather than a copy and rescan per chunk.
+    parts = []
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        start = 0
+        if parts and parts[-1].endswith("\n") and chunk.startswith("\n"):
+            # The separator straddles the chunk boundary.
+            parts[-1] = parts[-1][:-1]
+            block = "".join(parts)
+            parts = []
+            start = 1
+            if block != "":
+                yield block.strip()
+        while True:
+            end = chunk.find("\n\n", start)
+            if end == -1:
+                break
+            parts.append(chunk[start:end])
+            block = "".join(parts)
+            parts = []
+            start = end + 2
+            if block != "":
+                yield block.strip()
+        if start < len(chunk):
+            parts.append(chunk[start:])
+    block = "".join(parts)
+    if block != "":
+        yield block.strip()
+
+
+def blocks_to_html_nodes(blocks, cache=None):
     for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
+        if cache is None:
+            yield block_to_html_node(block)
+        else:
+            yield cache.render(block, block_to_html_node)
+
+
+def markdown_to_html_node(markdown, cache=None):
+    blocks = markdown_to_blocks(markdown)
+    children = list(blocks_to_html_nodes(blocks, cache))
     return ParentNode("div", children, None)
 
+
+def enabled_feature(module, name):
+    # Optional features are imported by the code that switches them on, so
+    # a module that was never imported is off and costs nothing at startup.
+    loaded = sys.modules.get(module)
+    feature = getattr(loaded, name, None)
+    return feature if feature is not None and feature.enabled else None
+
+
+def page_to_html_node(from_path, markdown, cache=None):
+    ast_cache = enabled_feature("astcache", "AST_CACHE")
+    if ast_cache is not None and from_path is not None:
+        return ast_cache.tree(
+            from_path, markdown, lambda content: markdown_to_html_node(content, cache)
+        )
+    return markdown_to_html_node(markdown, cache)
+
 def text_to_children(text):
     text_nodes = text_to_textnodes(text)
     children = []
@@ -192,14 +285,13 @@ def text_to_children(text):
     return children
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
+def paragraph_to_html_node(block, lines=None):
+    paragraph = block.replace("\n", " ")
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(block, lines=None):
     level = 0
     for char in block:
         if char == "#":
@@ -213,7 +305,7 @@ def heading_to_html_node(block):
     return ParentNode(f"h{level}", children)
 
 
-def code_to_html_node(block):
+def code_to_html_node(block, lines=None):
     if not block.startswith("```") or not block.endswith("```"):
         raise ValueError("invalid code block")
     text = block[4:-3]
@@ -222,8 +314,8 @@ def code_to_html_node(block):
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(block, lines=None):
+    items = lines if lines is not None else block.split("\n")
     html_items = []
     for item in items:
         text = item[3:]
@@ -232,8 +324,8 @@ def olist_to_html_node(block):
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(block, lines=None):
+    items = lines if lines is not None else block.split("\n")
     html_items = []
     for item in items:
         text = item[2:]
@@ -242,8 +334,9 @@ def ulist_to_html_node(block):
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(block, lines=None):
+    if lines is None:
+        lines = block.split("\n")
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
@@ -254,63 +347,152 @@ def quote_to_html_node(block):
     return ParentNode("blockquote", children)
 
 
+BLOCK_CONVERTERS = {
+    block_type_paragraph: paragraph_to_html_node,
+    block_type_heading: heading_to_html_node,
+    block_type_code: code_to_html_node,
+    block_type_olist: olist_to_html_node,
+    block_type_ulist: ulist_to_html_node,
+    block_type_quote: quote_to_html_node,
+}
+
+
+@timed("block_to_html_node")
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
-    if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
-    if block_type == block_type_heading:
-        return heading_to_html_node(block)
-    if block_type == block_type_code:
-        return code_to_html_node(block)
-    if block_type == block_type_olist:
-        return olist_to_html_node(block)
-    if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
-    if block_type == block_type_quote:
-        return quote_to_html_node(block)
-    raise ValueError("invalid block type")
-
-
-def copy_all(source, dest):
-    shutil.rmtree(dest)
+    block_type, lines = classify_block(block)
+    converter = BLOCK_CONVERTERS.get(block_type)
+    if converter is None:
+        raise ValueError("invalid block type")
+    return converter(block, lines)
+
+
+@timed("copy_all")
+def copy_all(source, dest, mode="copy"):
+    if os.path.exists(dest):
+        import shutil
+
+        shutil.rmtree(dest)
     os.mkdir(dest)
-    if not (os.path.isdir(source)):
-        raise Exception("Source not a directory")
-    for obj in os.listdir(source):
-        source_object = os.path.join(source, obj)
-        dest_object = os.path.join(dest, obj)
-        if os.path.isfile(source_object):
-            shutil.copy(source_object, dest)
-        elif os.path.isdir(source_object):
-            os.mkdir(dest_object)
-            copy_all(source_object, dest_object)
+    from assets import sync_assets
+
+    sync_assets(source, dest, {}, mode)
 
 
 def extract_markdown_title(title):
-    if re.match(r"# ", title):
+    if title.startswith("# "):
         return title.strip("# ")
     else:
         raise Exception("No header found")
 
 
-def generate_page(from_path, template_path, dest_path):
+def record_page_info(node, info):
+    from depgraph import record_targets
+
+    record_targets(node, info)
+    if "terms" in info:
+        from search import record_terms
+
+        record_terms(node, info)
+
+
+def observe_page_info(nodes, info):
+    for node in nodes:
+        record_page_info(node, info)
+        yield node
+
+
+def generate_page(from_path, template_path, dest_path, info=None):
     print(
         f"Generating page from {from_path} to {dest_path} using {template_path}"
     )
-    with open(from_path, "r") as f, open(template_path, "r") as t:
-        title = extract_markdown_title(f.readline())
-        f.seek(0)
-        content = f.read()
-        template = t.read()
-    html_nodes = markdown_to_html_node(content)
-    html_string = html_nodes.to_html()
-    filled_template = template.replace("{{ Title }}", title).replace(
-        "{{ Content }}", html_string
-    )
+    with PROFILER.page(from_path):
+        template = load_template(template_path)
+        cache = enabled_feature("blockcache", "BLOCK_CACHE")
+        resolver = enabled_feature("resolve", "LINK_RESOLVER")
+        with open(from_path, "r") as f:
+            meta = read_front_matter(f, from_path)
+            start = f.tell()
+            title = meta.get("title") or extract_markdown_title(f.readline())
+            if info is not None:
+                info["title"] = title
+            f.seek(start)
+            if (
+                os.fstat(f.fileno()).st_size >= STREAM_THRESHOLD
+                and template.occurrences("Content") <= 1
+            ):
+                # Blocks are read, rendered and written one at a time while
+                # the template is being written out.
+                nodes = blocks_to_html_nodes(iter_markdown_blocks(f), cache)
+                if resolver is not None:
+                    nodes = resolver.resolve_stream(nodes, from_path, dest_path)
+                if info is not None:
+                    nodes = observe_page_info(nodes, info)
+                html_nodes = ParentNode("div", nodes)
+            else:
+                with PROFILER.phase("read"):
+                    content = f.read()
+                with PROFILER.phase("markdown_to_html_node"):
+                    html_nodes = page_to_html_node(from_path, content, cache)
+                if resolver is not None:
+                    resolver.resolve(html_nodes, from_path, dest_path)
+                if info is not None:
+                    record_page_info(html_nodes, info)
+            values = {"Title": title, "Content": html_nodes}
+            template.check(values)
+            with PROFILER.phase("render"):
+                # Streamed blocks are parsed while the page is written, so it
+                # goes to a new file that only replaces the last good output
+                # once the whole page has rendered.
+                output = os.path.join(dest_path, "index.html")
+                tmp_path = f"{output}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp_path, "w") as w:
+                        template.write(PROFILER.sink(w), values)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+                os.replace(tmp_path, output)
+        if cache is not None:
+            cache.flush()
+        catalog = enabled_feature("catalog", "CATALOG")
+        if catalog is not None:
+            catalog.record(from_path, template_path, dest_path, title, meta)
+    return info
+
+
+def read_page(from_path):
+    with open(from_path, "r") as f:
+        meta, content = split_front_matter(f.read(), from_path)
+    first_line, newline, _ = content.partition("\n")
+    title = meta.get("title") or extract_markdown_title(first_line + newline)
+    return title, content, meta
+
+
+def render_page(
+    title, content, template_path, cache=None, info=None, from_path=None, dest_path=None,
+    meta=None,
+):
+    template = load_template(template_path)
+    html_nodes = page_to_html_node(from_path, content, cache)
+    resolver = enabled_feature("resolve", "LINK_RESOLVER")
+    if resolver is not None and dest_path is not None:
+        resolver.resolve(html_nodes, from_path, dest_path)
+    if info is not None:
+        info["title"] = title
+        record_page_info(html_nodes, info)
+    html = template.render({"Title": title, "Content": html_nodes})
+    catalog = enabled_feature("catalog", "CATALOG")
+    if catalog is not None and meta is not None:
+        catalog.record(from_path, template_path, dest_path, title, meta)
+    return html
+
+
+def write_page(dest_path, html):
     with open(os.path.join(dest_path, "index.html"), "w") as w:
-        w.write(filled_template)
+        w.write(html)
 
 def generate_page_recursive(dir_path_content, template_path, dest_dir_path):
+    template_path = directory_template(dir_path_content, template_path)
     obj_list = os.listdir(dir_path_content)
     print(obj_list)
     print(os.path.isfile(obj_list[0]))
@@ -323,10 +505,420 @@ def generate_page_recursive(dir_path_content, template_path, dest_dir_path):
             os.mkdir(os.path.join(dest_dir_path, obj))
             generate_page_recursive(os.path.join(dir_path_content, obj), template_path, os.path.join(dest_dir_path, obj))
 
-def main():
+def collect_pages(dir_path_content, template_path, dest_dir_path):
+    template_path = directory_template(dir_path_content, template_path)
+    pages = []
+    for obj in sorted(os.listdir(dir_path_content)):
+        source = os.path.join(dir_path_content, obj)
+        if os.path.isfile(source) and obj.endswith(".md"):
+            pages.append((source, template_path, dest_dir_path))
+        elif os.path.isdir(source):
+            pages.extend(
+                collect_pages(source, template_path, os.path.join(dest_dir_path, obj))
+            )
+    return pages
+
+COMMANDS = ("build", "serve", "bench", "daemon", "rebuild")
+
+
+def add_build_arguments(parser):
+    from assets import COPY_MODES
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages and assets that changed since the last build",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=".build/manifest.json",
+        help="where the incremental build keeps its manifest",
+    )
+    parser.add_argument(
+        "--broken-links",
+        action="store_true",
+        help="report links to missing pages and assets from the incremental build's link graph",
+    )
+    parser.add_argument(
+        "--resolve-links",
+        action="store_true",
+        help="rewrite relative links and images to canonical URLs and report broken ones",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded search index to public/search/ (needs --incremental)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="render pages on a pool of this many processes",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=0,
+        help="overlap reads, rendering and writes with this many I/O threads (not with --workers)",
+    )
+    parser.add_argument(
+        "--asset-mode",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are placed in public/",
+    )
+    parser.add_argument(
+        "--asset-compare",
+        choices=("mtime", "hash"),
+        default="mtime",
+        help="how the incremental build detects changed static files",
+    )
+    parser.add_argument(
+        "--shard",
+        help="build only shard INDEX/COUNT of the pages into --shard-dir",
+    )
+    parser.add_argument(
+        "--shard-dir", default="shard", help="output directory for --shard"
+    )
+    parser.add_argument(
+        "--merge-shards",
+        nargs="+",
+        metavar="SHARD_DIR",
+        help="combine shard directories into public/",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="publish static files under content-hashed names and rewrite links",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br with the brotli module) next to text outputs",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=1024,
+        help="skip outputs smaller than this many bytes",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="write sitemap.xml, feed.xml and directory listings from page metadata",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        help="absolute URL prefix for links in sitemap.xml and feed.xml",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="add resized derivatives, srcset, width and height to page images",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=int,
+        nargs="+",
+        default=[480, 960, 1440],
+        metavar="WIDTH",
+        help="widths --images resizes to (smaller than the source only)",
+    )
+    parser.add_argument(
+        "--webp", action="store_true", help="also write WebP derivatives with --images"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print per-phase timings and the slowest pages after the build",
+    )
+    parser.add_argument(
+        "--profile-json", help="also write the timing report to this JSON file"
+    )
+    parser.add_argument(
+        "--profile-page", help="dump cProfile stats for this markdown file"
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help="reuse rendered HTML for blocks seen before in this build",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=4096,
+        help="number of rendered blocks kept in memory",
+    )
+    parser.add_argument(
+        "--block-cache-path",
+        help="sqlite file that keeps rendered blocks between builds",
+    )
+    parser.add_argument(
+        "--ast-cache",
+        action="store_true",
+        help="keep each page's parsed tree in a memory-mapped file between builds",
+    )
+    parser.add_argument(
+        "--ast-cache-dir",
+        default=".build/ast",
+        help="where --ast-cache keeps its per-page files",
+    )
+
+
+def build_parser():
+    import argparse
+
+    from assets import COPY_MODES
+
+    parser = argparse.ArgumentParser(description="Build the static site")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    build = commands.add_parser("build", help="build content/ into public/ (the default)")
+    add_build_arguments(build)
+    build.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve public/ and rebuild changed pages until interrupted",
+    )
+    build.add_argument(
+        "--port", type=int, default=8888, help="port for the --watch dev server"
+    )
+    serve = commands.add_parser(
+        "serve", help="build incrementally, serve public/ and rebuild on changes"
+    )
+    serve.add_argument("--port", type=int, default=8888, help="port to serve public/ on")
+    serve.add_argument(
+        "--manifest",
+        default=".build/manifest.json",
+        help="where the incremental build keeps its manifest",
+    )
+    serve.add_argument(
+        "--workers", type=int, default=1, help="render pages on this many processes"
+    )
+    serve.add_argument(
+        "--asset-mode",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are placed in public/",
+    )
+    commands.add_parser("bench", help="run a benchmark, see `bench --help`")
+    daemon = commands.add_parser(
+        "daemon", help="keep the parsed site in memory and rebuild on request"
+    )
+    daemon.add_argument(
+        "--socket", default=".build/daemon.sock", help="Unix socket to listen on"
+    )
+    daemon.add_argument(
+        "--manifest",
+        default=".build/manifest.json",
+        help="where the incremental build keeps its manifest",
+    )
+    daemon.add_argument(
+        "--asset-mode",
+        choices=COPY_MODES,
+        default="copy",
+        help="how static files are placed in public/",
+    )
+    daemon.add_argument("--stop", action="store_true", help="stop a running daemon")
+    rebuild = commands.add_parser("rebuild", help="ask a running daemon to rebuild")
+    rebuild.add_argument(
+        "paths",
+        nargs="*",
+        metavar="PATH",
+        help="changed sources, templates or static files (default: whatever changed)",
+    )
+    rebuild.add_argument(
+        "--socket", default=".build/daemon.sock", help="Unix socket of the daemon"
+    )
+    rebuild.add_argument(
+        "--status", action="store_true", help="print what the daemon holds in memory"
+    )
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # `main.py [options]` from before the subcommands still means a build.
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["build"] + argv
+    if argv[0] == "bench":
+        from bench import main_cli
+
+        return main_cli(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "daemon":
+        from daemon import BuildDaemon, send_request, serve
+
+        if args.stop:
+            try:
+                send_request({"command": "shutdown"}, args.socket)
+            except OSError:
+                parser.error(f"no build daemon listening on {args.socket}")
+            return
+        print("Welcome to the Nodesifyer!")
+        serve(
+            BuildDaemon(
+                "content", "template.html", "static", "public", args.manifest,
+                args.asset_mode,
+            ),
+            args.socket,
+        )
+        return
+    if args.command == "rebuild":
+        from daemon import send_request
+
+        paths = [os.path.abspath(path) for path in args.paths] or None
+        request = (
+            {"command": "status"} if args.status
+            else {"command": "rebuild", "paths": paths}
+        )
+        try:
+            response = send_request(request, args.socket)
+        except OSError:
+            parser.error(f"no build daemon listening on {args.socket}")
+        if args.status:
+            print(response)
+            return
+        if "error" in response:
+            parser.error(response["error"])
+        print(
+            f"Pages: {len(response['generated'])} generated, "
+            f"{len(response['removed'])} removed, {len(response['failures'])} failed; "
+            f"{response['assets']} static file(s) synced in "
+            f"{response['seconds'] * 1000:.1f} ms"
+        )
+        for from_path, error in response["failures"]:
+            print(f"Failed to generate {from_path}: {error}")
+        if response["failures"]:
+            sys.exit(1)
+        return
+    if args.command == "serve":
+        from watch import watch
+
+        print("Welcome to the Nodesifyer!")
+        watch(
+            "content", "template.html", "static", "public", args.manifest,
+            args.port, max(args.workers, 1), args.asset_mode,
+        )
+        return
+    if args.broken_links and not args.incremental:
+        parser.error("--broken-links needs --incremental, which maintains the link graph")
+    if args.search and not args.incremental:
+        parser.error("--search needs --incremental, which keeps the index up to date")
+    if args.io_workers and args.workers > 1:
+        parser.error("--io-workers renders on one thread; it cannot be combined with --workers")
+    if args.catalog and (args.shard or args.merge_shards):
+        parser.error("--catalog needs every page rendered by this build")
     print("Welcome to the Nodesifyer!")
-    copy_all("static", "public")
-    generate_page_recursive("content", "template.html", "public")
+    if args.block_cache or args.block_cache_path:
+        from blockcache import BLOCK_CACHE
+
+        BLOCK_CACHE.enabled = True
+        BLOCK_CACHE.maxsize = args.block_cache_size
+        BLOCK_CACHE.path = args.block_cache_path
+    if args.resolve_links:
+        from resolve import LINK_RESOLVER
+
+        LINK_RESOLVER.enabled = True
+        LINK_RESOLVER.dest_dir = args.shard_dir if args.shard else "public"
+    if args.catalog:
+        from catalog import CATALOG
+
+        CATALOG.enabled = True
+        CATALOG.site_url = args.site_url.rstrip("/")
+    if args.ast_cache:
+        from astcache import AST_CACHE
+
+        AST_CACHE.enabled = True
+        AST_CACHE.directory = args.ast_cache_dir
+    if args.profile or args.profile_json or args.profile_page:
+        PROFILER.enabled = True
+        if args.profile_page:
+            PROFILER.profile_page = os.path.normpath(args.profile_page)
+            PROFILER.profile_path = PROFILER.profile_page.replace(os.sep, "_") + ".prof"
+    if args.watch:
+        from watch import watch
+
+        watch(
+            "content", "template.html", "static", "public", args.manifest,
+            args.port, max(args.workers, 1), args.asset_mode,
+        )
+        return
+    if args.shard:
+        from shard import build_shard, parse_shard
+
+        index, count = parse_shard(args.shard)
+        failures = build_shard(
+            "content", "template.html", args.shard_dir, index, count, args.workers
+        )
+    elif args.merge_shards:
+        from shard import merge_shards
+
+        failures = merge_shards(
+            args.merge_shards, "static", "public", ".build/shards.json"
+        )
+    elif args.incremental:
+        from build import build_incremental
+
+        failures = build_incremental(
+            "content", "template.html", "static", "public", args.manifest,
+            args.workers, args.asset_mode, args.asset_compare, args.io_workers,
+            args.search,
+        )
+    elif args.workers or args.io_workers:
+        from build import generate_pages
+
+        copy_all("static", "public", args.asset_mode)
+        failures = generate_pages(
+            collect_pages("content", "template.html", "public"), args.workers,
+            args.io_workers,
+        )
+    else:
+        copy_all("static", "public", args.asset_mode)
+        generate_page_recursive("content", "template.html", "public")
+        failures = []
+    if args.catalog and not args.incremental:
+        CATALOG.update("public")
+        CATALOG.write("public")
+    if args.images and not args.shard:
+        from images import process_images
+
+        process_images(
+            "static", "public", args.workers or None, tuple(args.image_widths),
+            args.webp, args.asset_mode,
+        )
+    if args.fingerprint and not args.shard:
+        from fingerprint import fingerprint_assets
+
+        fingerprint_assets("static", "public", args.asset_mode)
+    if args.compress and not args.shard:
+        from compress import compress_outputs
+
+        compress_outputs("public", args.workers or None, args.compress_min_size)
+    if args.resolve_links:
+        from resolve import site_urls
+
+        LINK_RESOLVER.report(
+            site_urls("content", "template.html", "static", LINK_RESOLVER.dest_dir)
+        )
+    if args.broken_links:
+        from build import report_broken_links
+
+        report_broken_links(args.manifest)
+    if args.block_cache or args.block_cache_path:
+        print(BLOCK_CACHE.report())
+    if args.ast_cache:
+        print(AST_CACHE.report())
+    if PROFILER.enabled:
+        print(PROFILER.report())
+        if args.profile_json:
+            PROFILER.write_json(args.profile_json)
+        if args.profile_page:
+            print(f"cProfile stats for {args.profile_page} written to {PROFILER.profile_path}")
+    if failures:
+        print(f"{len(failures)} page(s) failed to generate")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
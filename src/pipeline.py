@@ -0,0 +1,114 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from blockcache import BLOCK_CACHE
+from depgraph import new_page_info
+from search import start_terms
+from main import read_page, render_page, write_page
+
+_DONE = object()
+
+
+async def _read_stage(loop, executor, pages, read_queue):
+    for page in pages:
+        from_path = page[0]
+        try:
+            source = await loop.run_in_executor(executor, read_page, from_path)
+        except Exception as e:
+            await read_queue.put((page, None, e))
+            continue
+        await read_queue.put((page, source, None))
+
+
+async def _render_stage(
+    loop, executor, read_queue, write_queue, readers, page_info, search=False
+):
+    cache = BLOCK_CACHE if BLOCK_CACHE.enabled else None
+    finished = 0
+    while finished < readers:
+        item = await read_queue.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        page, source, error = item
+        if error is None:
+            from_path, template_path, dest_path = page
+            print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+            info = new_page_info() if page_info is not None else None
+            if search:
+                start_terms(info)
+            try:
+                html = await loop.run_in_executor(
+                    executor, render_page, source[0], source[1], template_path, cache,
+                    info, from_path, dest_path, source[2],
+                )
+                if info is not None:
+                    page_info[from_path] = info
+            except Exception as e:
+                error = e
+        await write_queue.put((page, html if error is None else None, error))
+
+
+async def _write_stage(loop, executor, write_queue, failures):
+    while True:
+        item = await write_queue.get()
+        if item is _DONE:
+            return
+        page, html, error = item
+        if error is None:
+            try:
+                await loop.run_in_executor(executor, write_page, page[2], html)
+            except Exception as e:
+                error = e
+        if error is not None:
+            failures.append((page[0], f"{type(error).__name__}: {error}"))
+
+
+async def generate_pages_async(
+    pages, io_workers=8, queue_size=16, page_info=None, search=False
+):
+    loop = asyncio.get_running_loop()
+    for _, _, dest_path in pages:
+        os.makedirs(dest_path, exist_ok=True)
+    # The bounded queues are the backpressure: readers stop prefetching and
+    # the renderer stops producing once writes fall queue_size pages behind.
+    read_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    failures = []
+    readers = max(1, io_workers // 2)
+    shares = [pages[i::readers] for i in range(readers)]
+    with ThreadPoolExecutor(max_workers=io_workers) as io_executor, \
+            ThreadPoolExecutor(max_workers=1) as render_executor:
+
+        async def reader(share):
+            try:
+                await _read_stage(loop, io_executor, share, read_queue)
+            finally:
+                await read_queue.put(_DONE)
+
+        writers = [
+            asyncio.create_task(_write_stage(loop, io_executor, write_queue, failures))
+            for _ in range(max(1, io_workers - readers))
+        ]
+        reader_tasks = [asyncio.create_task(reader(share)) for share in shares]
+        await _render_stage(
+            loop, render_executor, read_queue, write_queue, readers, page_info, search
+        )
+        await asyncio.gather(*reader_tasks)
+        for _ in writers:
+            await write_queue.put(_DONE)
+        await asyncio.gather(*writers)
+        if BLOCK_CACHE.enabled:
+            # The cache's sqlite connection belongs to the render thread.
+            await loop.run_in_executor(render_executor, BLOCK_CACHE.flush)
+    failures.sort()
+    for from_path, error in failures:
+        print(f"Failed to generate {from_path}: {error}")
+    return failures
+
+
+def generate_pages_pipelined(pages, io_workers=8, queue_size=16, page_info=None, search=False):
+    return asyncio.run(
+        generate_pages_async(pages, io_workers, queue_size, page_info, search)
+    )
@@ -0,0 +1,150 @@
+import functools
+import time
+from contextlib import contextmanager, nullcontext
+
+_disabled = nullcontext()
+
+
+class TimedSink:
+
+    def __init__(self, sink, profiler) -> None:
+        self.sink = sink
+        self.profiler = profiler
+
+    def write(self, text):
+        start = time.perf_counter()
+        result = self.sink.write(text)
+        self.profiler.record("write", time.perf_counter() - start)
+        return result
+
+
+class Profiler:
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.profile_page = None
+        self.profile_path = None
+        self.reset()
+
+    def reset(self):
+        # phase name -> [calls, seconds]
+        self.phases = {}
+        # page path -> seconds
+        self.pages = {}
+        self.active = set()
+
+    def record(self, name, elapsed):
+        entry = self.phases.get(name)
+        if entry is None:
+            self.phases[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def phase(self, name):
+        if not self.enabled or name in self.active:
+            return _disabled
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name):
+        self.active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            self.active.discard(name)
+
+    def page(self, path):
+        if not self.enabled:
+            return _disabled
+        return self._page(path)
+
+    @contextmanager
+    def _page(self, path):
+        profile = None
+        if self.profile_page is not None and path == self.profile_page:
+            import cProfile
+
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.pages[path] = self.pages.get(path, 0) + time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.profile_path)
+
+    def sink(self, sink):
+        if not self.enabled:
+            return sink
+        return TimedSink(sink, self)
+
+    def drain(self):
+        data = {"phases": self.phases, "pages": self.pages}
+        self.reset()
+        return data
+
+    def merge(self, data):
+        for name, (calls, elapsed) in data["phases"].items():
+            entry = self.phases.setdefault(name, [0, 0])
+            entry[0] += calls
+            entry[1] += elapsed
+        for path, elapsed in data["pages"].items():
+            self.pages[path] = self.pages.get(path, 0) + elapsed
+
+    def to_json(self, slowest=10):
+        pages = sorted(self.pages.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "phases": {
+                name: {"calls": calls, "seconds": elapsed}
+                for name, (calls, elapsed) in sorted(self.phases.items())
+            },
+            "pages": len(self.pages),
+            "page_seconds": sum(self.pages.values()),
+            "slowest_pages": [
+                {"path": path, "seconds": elapsed} for path, elapsed in pages[:slowest]
+            ],
+        }
+
+    def write_json(self, path, slowest=10):
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.to_json(slowest), f, indent=1)
+
+    def report(self, slowest=10):
+        data = self.to_json(slowest)
+        lines = [f"{'phase':<22} {'calls':>9} {'total ms':>11} {'per call us':>12}"]
+        for name, entry in sorted(
+            data["phases"].items(), key=lambda item: item[1]["seconds"], reverse=True
+        ):
+            lines.append(
+                f"{name:<22} {entry['calls']:>9} {entry['seconds'] * 1000:>11.2f} "
+                f"{entry['seconds'] / entry['calls'] * 1e6:>12.1f}"
+            )
+        lines.append("")
+        lines.append(f"{'slowest pages':<50} {'ms':>9}")
+        for page in data["slowest_pages"]:
+            lines.append(f"{page['path']:<50} {page['seconds'] * 1000:>9.2f}")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
+
+
+def timed(name):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
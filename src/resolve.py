@@ -0,0 +1,112 @@
+import os
+import re
+
+from depgraph import RAW_TARGET_RE, is_internal, normalize_url, page_url
+from htmlnode import RawNode
+
+SUFFIX_RE = re.compile(r"[?#]")
+KINDS = {"a": "links", "img": "images"}
+
+
+def canonical_url(target, base_url):
+    match = SUFFIX_RE.search(target)
+    suffix = target[match.start() :] if match else ""
+    return normalize_url(target, base_url) + suffix
+
+
+def site_urls(content_dir, template_path, static_dir, dest_dir):
+    from main import collect_pages
+
+    # One pass over each tree up front; targets are then checked against
+    # these sets instead of stat-ing every link.
+    urls = {
+        page_url(dest_path, dest_dir)
+        for _, _, dest_path in collect_pages(content_dir, template_path, dest_dir)
+    }
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            rel_path = os.path.relpath(os.path.join(root, name), static_dir)
+            urls.add("/" + rel_path.replace(os.sep, "/"))
+    return urls
+
+
+class LinkResolver:
+
+    def __init__(self, dest_dir="public") -> None:
+        self.enabled = False
+        self.dest_dir = dest_dir
+        # source path -> {"links": set of URLs, "images": set of URLs}
+        self.targets = {}
+
+    def drain(self):
+        targets = self.targets
+        self.targets = {}
+        return targets
+
+    def merge(self, targets):
+        for source, found in targets.items():
+            entry = self.targets.setdefault(source, {"links": set(), "images": set()})
+            entry["links"] |= found["links"]
+            entry["images"] |= found["images"]
+
+    def _rewrite_raw(self, html, base, found):
+        def replace(match):
+            tag, target = match.groups()
+            if not is_internal(target):
+                return match.group(0)
+            url = canonical_url(target, base)
+            found[KINDS[tag]].add(normalize_url(url, base))
+            return f'<{tag} href="{url}"'
+
+        return RAW_TARGET_RE.sub(replace, html)
+
+    def _rewrite(self, node, base, found):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, RawNode):
+                # The block cache keeps targets as written; they are resolved
+                # for each page that uses the block.
+                node.value = self._rewrite_raw(node.value, base, found)
+            elif node.children is not None:
+                stack.extend(node.children)
+            elif node.tag in KINDS and node.props:
+                target = node.props.get("href")
+                if is_internal(target):
+                    url = canonical_url(target, base)
+                    found[KINDS[node.tag]].add(normalize_url(url, base))
+                    node.props = dict(node.props, href=url)
+
+    def resolve(self, node, from_path, dest_path):
+        found = self.targets.setdefault(from_path, {"links": set(), "images": set()})
+        url = page_url(dest_path, self.dest_dir)
+        self._rewrite(node, url.rstrip("/") + "/", found)
+        return node
+
+    def resolve_stream(self, nodes, from_path, dest_path):
+        for node in nodes:
+            yield self.resolve(node, from_path, dest_path)
+
+    def broken(self, known):
+        targets = set()
+        for found in self.targets.values():
+            targets |= found["links"] | found["images"]
+        missing = targets - known
+        broken = []
+        for source, found in sorted(self.targets.items()):
+            for kind in ("links", "images"):
+                for target in sorted(found[kind] & missing):
+                    broken.append((source, kind[:-1], target))
+        return broken
+
+    def report(self, known):
+        broken = self.broken(known)
+        for source, kind, target in broken:
+            print(f"Broken {kind} in {source}: {target}")
+        checked = sum(len(found["links"]) + len(found["images"]) for found in self.targets.values())
+        pages = len({source for source, _, _ in broken})
+        print(f"Links: {checked} targets checked, {len(broken)} broken in {pages} pages")
+        return broken
+
+
+LINK_RESOLVER = LinkResolver()
@@ -0,0 +1,226 @@
+import os
+import re
+
+from htmlnode import RawNode
+
+SEARCH_DIR = "search"
+SEARCH_VERSION = 1
+# Terms are sharded by their first PREFIX_LENGTH characters, so a browser
+# only fetches the shard for what the reader is typing.
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+WORD_RE = re.compile(r"\w+")
+SLUG_RE = re.compile(r"[^\w]+")
+RAW_HEADING_RE = re.compile(r"<h([1-6])>(.*?)</h\1>", re.S)
+TAG_RE = re.compile(r"<[^>]*>")
+HEADING_TAGS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+
+
+def start_terms(info):
+    info["terms"] = {}
+    info["headings"] = []
+    info["position"] = 0
+    return info
+
+
+def slugify(text, headings):
+    slug = SLUG_RE.sub("-", text.lower()).strip("-") or "section"
+    taken = {heading[0] for heading in headings}
+    candidate, n = slug, 1
+    while candidate in taken:
+        candidate = f"{slug}-{n}"
+        n += 1
+    return candidate
+
+
+def _add_words(text, info):
+    terms = info["terms"]
+    position = info["position"]
+    for word in WORD_RE.findall(text.lower()):
+        if len(word) >= MIN_TERM_LENGTH:
+            terms.setdefault(word, []).append(position)
+        position += 1
+    info["position"] = position
+
+
+def _add_heading(text, info):
+    text = " ".join(text.split())
+    slug = slugify(text, info["headings"])
+    info["headings"].append([slug, text, info["position"]])
+    _add_words(text, info)
+    return slug
+
+
+def _leaf_text(node):
+    parts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children is not None:
+            stack.extend(reversed(node.children))
+        elif node.value:
+            parts.append(node.value)
+    return " ".join(parts)
+
+
+def record_terms(node, info):
+    # Headings get the id their anchor in the index points at; this runs
+    # before the page is written, so the rendered HTML carries them.
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, RawNode):
+            # Cached blocks only exist as HTML; tags separate words the same
+            # way leaf boundaries do.
+            html = node.value
+            parts = []
+            position = 0
+            for match in RAW_HEADING_RE.finditer(html):
+                _add_words(TAG_RE.sub(" ", html[position : match.start()]), info)
+                slug = _add_heading(TAG_RE.sub(" ", match.group(2)), info)
+                level = match.group(1)
+                parts.append(html[position : match.start()])
+                parts.append(f'<h{level} id="{slug}">{match.group(2)}</h{level}>')
+                position = match.end()
+            _add_words(TAG_RE.sub(" ", html[position:]), info)
+            if parts:
+                parts.append(html[position:])
+                node.value = "".join(parts)
+        elif node.tag in HEADING_TAGS:
+            slug = _add_heading(_leaf_text(node), info)
+            node.props = {**(node.props or {}), "id": slug}
+        elif node.children is not None:
+            stack.extend(reversed(node.children))
+        elif node.value:
+            _add_words(node.value, info)
+
+
+def _write_if_changed(path, text):
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return
+    except OSError:
+        pass
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class SearchIndex:
+
+    def __init__(self, pages=None, next_id=0) -> None:
+        # source path -> {"id", "url", "title", "headings", "terms"}
+        self.pages = pages if pages is not None else {}
+        self.next_id = next_id
+        self.dirty = set()
+
+    @classmethod
+    def load(cls, path):
+        import json
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != SEARCH_VERSION:
+            return cls()
+        return cls(data["pages"], data["next_id"])
+
+    def save(self, path):
+        import json
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"version": SEARCH_VERSION, "next_id": self.next_id, "pages": self.pages},
+                f, separators=(",", ":"),
+            )
+
+    def _touch(self, entry):
+        if entry is not None:
+            self.dirty.update(term[:PREFIX_LENGTH] for term in entry["terms"])
+
+    def update(self, source, url, title, info):
+        previous = self.pages.get(source)
+        if previous is not None:
+            page_id = previous["id"]
+            # A regenerated page usually keeps most of its words; only the
+            # shards holding terms whose postings moved need writing.
+            old_terms, new_terms = previous["terms"], info["terms"]
+            self.dirty.update(
+                term[:PREFIX_LENGTH]
+                for term in old_terms.keys() | new_terms.keys()
+                if old_terms.get(term) != new_terms.get(term)
+            )
+        else:
+            page_id = self.next_id
+            self.next_id += 1
+        self.pages[source] = {
+            "id": page_id,
+            "url": url,
+            "title": title.strip(),
+            "headings": info["headings"],
+            "terms": info["terms"],
+        }
+        if previous is None:
+            self._touch(self.pages[source])
+
+    def remove(self, source):
+        self._touch(self.pages.pop(source, None))
+
+    def shards(self):
+        shards = {}
+        for entry in self.pages.values():
+            for term, positions in entry["terms"].items():
+                shard = shards.setdefault(term[:PREFIX_LENGTH], {})
+                shard.setdefault(term, []).append([entry["id"], *positions])
+        for shard in shards.values():
+            for postings in shard.values():
+                postings.sort()
+        return shards
+
+    def write(self, dest_dir):
+        import json
+
+        directory = os.path.join(dest_dir, SEARCH_DIR)
+        os.makedirs(directory, exist_ok=True)
+        shards = self.shards()
+        # A shard whose file went missing (public/ was wiped, say) is written
+        # again even if none of its pages changed.
+        targets = self.dirty | {
+            prefix for prefix in shards
+            if not os.path.exists(os.path.join(directory, f"{prefix}.json"))
+        }
+        written = 0
+        for prefix in sorted(targets):
+            path = os.path.join(directory, f"{prefix}.json")
+            if prefix not in shards:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, "w") as f:
+                json.dump(shards[prefix], f, separators=(",", ":"), sort_keys=True)
+            written += 1
+        # Postings only carry word positions; a hit's heading anchor is the
+        # last heading whose start position is at or before it.
+        pages = {
+            entry["id"]: {
+                "url": entry["url"], "title": entry["title"], "headings": entry["headings"],
+            }
+            for entry in self.pages.values()
+        }
+        _write_if_changed(
+            os.path.join(directory, "pages.json"),
+            json.dumps(pages, separators=(",", ":"), sort_keys=True),
+        )
+        _write_if_changed(
+            os.path.join(directory, "index.json"),
+            json.dumps({"prefix_length": PREFIX_LENGTH, "shards": sorted(shards)}),
+        )
+        self.dirty = set()
+        terms = sum(len(shard) for shard in shards.values())
+        print(f"Search index: {terms} terms in {len(shards)} shards, {written} shards written")
+        return written
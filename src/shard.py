@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+
+from assets import file_hash
+from build import generate_pages
+from main import collect_pages, copy_all
+
+SHARD_MANIFEST = ".shard-manifest.json"
+
+
+def shard_of(rel_path, count):
+    # Hash the path relative to the content root with a stable digest so
+    # every host puts a page in the same shard.
+    key = rel_path.replace(os.sep, "/").encode()
+    return int.from_bytes(hashlib.sha1(key).digest()[:8], "big") % count
+
+
+def parse_shard(spec):
+    index, _, count = spec.partition("/")
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard {spec}, expected INDEX/COUNT with 0 <= INDEX < COUNT")
+    return index, count
+
+
+def shard_pages(content_dir, template_path, dest_dir, index, count):
+    pages = []
+    for page in collect_pages(content_dir, template_path, dest_dir):
+        if shard_of(os.path.relpath(page[0], content_dir), count) == index:
+            pages.append(page)
+    return pages
+
+
+def build_shard(content_dir, template_path, shard_dir, index, count, workers=1):
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.makedirs(shard_dir)
+    pages = shard_pages(content_dir, template_path, shard_dir, index, count)
+    failures = generate_pages(pages, workers)
+    failed = {from_path for from_path, _ in failures}
+    outputs = {}
+    for from_path, _, dest_path in pages:
+        if from_path in failed:
+            continue
+        output = os.path.join(dest_path, "index.html")
+        outputs[os.path.relpath(output, shard_dir)] = {
+            "source": os.path.relpath(from_path, content_dir),
+            "hash": file_hash(output),
+        }
+    manifest = {
+        "index": index,
+        "count": count,
+        "outputs": outputs,
+        "failures": [
+            [os.path.relpath(from_path, content_dir), error] for from_path, error in failures
+        ],
+    }
+    with open(os.path.join(shard_dir, SHARD_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    print(f"Shard {index}/{count}: {len(outputs)} pages, {len(failures)} failed")
+    return failures
+
+
+def load_shard_manifests(shard_dirs):
+    manifests = []
+    for shard_dir in shard_dirs:
+        with open(os.path.join(shard_dir, SHARD_MANIFEST)) as f:
+            manifests.append((shard_dir, json.load(f)))
+    counts = {manifest["count"] for _, manifest in manifests}
+    if len(counts) != 1:
+        raise ValueError(f"shards were built with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indices = sorted(manifest["index"] for _, manifest in manifests)
+    if indices != list(range(count)):
+        raise ValueError(f"expected shards 0..{count - 1}, got {indices}")
+    return manifests
+
+
+def merge_shards(shard_dirs, static_dir, dest_dir, manifest_path=None):
+    manifests = load_shard_manifests(shard_dirs)
+    copy_all(static_dir, dest_dir)
+    merged = {}
+    failures = []
+    for shard_dir, manifest in manifests:
+        for output, entry in manifest["outputs"].items():
+            if output in merged:
+                raise ValueError(
+                    f"{output} was built by shard {merged[output]['shard']} "
+                    f"and shard {manifest['index']}"
+                )
+            source = os.path.join(shard_dir, output)
+            if file_hash(source) != entry["hash"]:
+                raise ValueError(f"{source} does not match its shard manifest")
+            destination = os.path.join(dest_dir, output)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+            merged[output] = dict(entry, shard=manifest["index"])
+        failures.extend(tuple(failure) for failure in manifest["failures"])
+    if manifest_path is not None:
+        directory = os.path.dirname(manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"outputs": merged, "failures": failures}, f, indent=1, sort_keys=True)
+    print(f"Merged {len(manifests)} shards: {len(merged)} pages, {len(failures)} failed")
+    for from_path, error in failures:
+        print(f"Failed to generate {from_path}: {error}")
+    return failures
@@ -0,0 +1,67 @@
+import os
+import re
+
+TEMPLATE_NAME = "template.html"
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+_cache = {}
+
+
+class Template:
+
+    def __init__(self, source, path=None) -> None:
+        self.path = path
+        # Even indices hold literal text, odd indices hold placeholder names.
+        self.segments = PLACEHOLDER_RE.split(source)
+        self.names = frozenset(self.segments[1::2])
+
+    def occurrences(self, name):
+        return self.segments[1::2].count(name)
+
+    def check(self, values):
+        for name in self.segments[1::2]:
+            if name not in values:
+                location = f" in {self.path}" if self.path is not None else ""
+                raise ValueError(f"Unknown placeholder {{{{ {name} }}}}{location}")
+
+    def render(self, values):
+        self.check(values)
+        output = []
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                output.append(segment)
+                continue
+            value = values[segment]
+            output.append(value if isinstance(value, str) else value.to_html())
+        return "".join(output)
+
+    def write(self, sink, values):
+        self.check(values)
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                sink.write(segment)
+                continue
+            value = values[segment]
+            if isinstance(value, str):
+                sink.write(value)
+            else:
+                value.write_html(sink)
+
+
+def load_template(path):
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, "r") as f:
+        template = Template(f.read(), path)
+    _cache[path] = (key, template)
+    return template
+
+
+def directory_template(directory, inherited):
+    override = os.path.join(directory, TEMPLATE_NAME)
+    if os.path.isfile(override):
+        return override
+    return inherited
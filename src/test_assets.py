@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import assets
+
+
+class TestSyncAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write("index.css", "body {}")
+        self.write(os.path.join("images", "a.png"), "png" * 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.source, rel_path), "w") as f:
+            f.write(text)
+
+    def read(self, rel_path):
+        with open(os.path.join(self.dest, rel_path)) as f:
+            return f.read()
+
+    def sync(self, previous, **kwargs):
+        with redirect_stdout(StringIO()) as out:
+            current = assets.sync_assets(self.source, self.dest, previous, **kwargs)
+        return current, out.getvalue()
+
+    def test_copies_only_changed_files(self):
+        manifest, out = self.sync({})
+        self.assertIn("2 copied, 0 removed", out)
+        manifest, out = self.sync(manifest)
+        self.assertIn("0 copied, 0 removed", out)
+        self.write("index.css", "body { color: red }")
+        manifest, out = self.sync(manifest)
+        self.assertIn("1 copied, 0 removed", out)
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_removes_stale_files(self):
+        manifest, _ = self.sync({})
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        _, out = self.sync(manifest)
+        self.assertIn("0 copied, 1 removed", out)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+
+    def test_hash_compare_ignores_touch(self):
+        manifest, _ = self.sync({}, compare="hash")
+        os.utime(os.path.join(self.source, "index.css"), ns=(0, 0))
+        _, out = self.sync(manifest, compare="hash")
+        self.assertIn("0 copied, 0 removed", out)
+
+    def test_copy_modes(self):
+        for mode in assets.COPY_MODES:
+            self.sync({}, mode=mode, workers=1)
+            self.assertEqual(self.read("images/a.png"), "png" * 100)
+        source = os.stat(os.path.join(self.source, "index.css"))
+        self.sync({}, mode="hardlink")
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_ino, source.st_ino)
+        # Going back to copies must not write through the old hardlink.
+        self.sync({}, mode="copy")
+        with open(os.path.join(self.dest, "index.css"), "w") as f:
+            f.write("changed")
+        with open(os.path.join(self.source, "index.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.sync({}, mode="teleport")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import astcache
+import main
+from htmlnode import LeafNode, ParentNode, RawNode
+
+DIGEST = bytes(range(32))
+MARKDOWN = (
+    "# Title\n\nSome **bold** and [a link](/x) with ![img](/y.png)\n\n"
+    "```\ncode\n```\n\n> quote\n\n1. one\n2. two"
+)
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_round_trip(self):
+        tree = main.markdown_to_html_node(MARKDOWN)
+        decoded = astcache.decode_tree(astcache.encode_tree(tree, DIGEST), DIGEST)
+        self.assertEqual(decoded, tree)
+        self.assertEqual(decoded.to_html(), tree.to_html())
+
+    def test_raw_nodes_and_props(self):
+        tree = ParentNode(
+            "div", [RawNode("<p>cached</p>"), LeafNode("x", "a", {"href": "/", "title": "t"})]
+        )
+        decoded = astcache.decode_tree(astcache.encode_tree(tree, DIGEST))
+        self.assertIsInstance(decoded.children[0], RawNode)
+        self.assertEqual(decoded.children[1].props, {"href": "/", "title": "t"})
+        self.assertEqual(decoded.to_html(), tree.to_html())
+
+    def test_stale_caches_are_rejected(self):
+        data = astcache.encode_tree(main.markdown_to_html_node(MARKDOWN), DIGEST)
+        newer = data[:6] + struct.pack("<H", astcache.FORMAT_VERSION + 1) + data[8:]
+        for buffer in (newer, data[:20], data[:-3], b"nonsense" * 10):
+            with self.assertRaises(astcache.StaleCache):
+                astcache.decode_tree(buffer, DIGEST)
+        with self.assertRaises(astcache.StaleCache):
+            astcache.decode_tree(data, bytes(32))
+
+
+class TestAstCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = astcache.AstCache(os.path.join(self.tmp.name, "ast"))
+        self.source = os.path.join(self.tmp.name, "index.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_after_miss(self):
+        first = self.cache.tree(self.source, MARKDOWN, main.markdown_to_html_node)
+        second = self.cache.tree(self.source, MARKDOWN, self.fail)
+        self.assertEqual(first.to_html(), second.to_html())
+        self.assertEqual(self.cache.drain_counters(), {"hits": 1, "misses": 1, "rejected": 0})
+
+    def test_changed_source_is_parsed_again(self):
+        self.cache.tree(self.source, MARKDOWN, main.markdown_to_html_node)
+        tree = self.cache.tree(self.source, "# Other", main.markdown_to_html_node)
+        self.assertEqual(tree.to_html(), "<div><h1>Other</h1></div>")
+        self.assertEqual(self.cache.rejected, 1)
+
+    def test_truncated_file_is_replaced(self):
+        self.cache.tree(self.source, MARKDOWN, main.markdown_to_html_node)
+        path = self.cache.path(self.source)
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+        self.cache.tree(self.source, MARKDOWN, main.markdown_to_html_node)
+        self.assertEqual(self.cache.rejected, 1)
+        self.cache.tree(self.source, MARKDOWN, self.fail)
+
+    def test_corrupt_files_are_misses(self):
+        markdown = MARKDOWN * 5
+        expected = main.markdown_to_html_node(markdown).to_html()
+        self.cache.tree(self.source, markdown, main.markdown_to_html_node)
+        path = self.cache.path(self.source)
+        with open(path, "rb") as f:
+            data = f.read()
+        # Flipped bytes land in the header, the node and prop records and
+        # the string table; none of them may escape as anything but a miss.
+        for offset in range(0, len(data), 7):
+            corrupt = bytearray(data)
+            corrupt[offset] ^= 0xFF
+            with open(path, "wb") as f:
+                f.write(corrupt)
+            tree = self.cache.tree(self.source, markdown, main.markdown_to_html_node)
+            self.assertEqual(tree.to_html(), expected)
+        self.cache.tree(self.source, markdown, self.fail)
+
+    def fail(self, content):
+        raise AssertionError("expected a cache hit")
+
+
+if __name__ == "__main__":
+    unittest.main()
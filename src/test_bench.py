@@ -0,0 +1,31 @@
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import bench
+
+
+class TestCompareResults(unittest.TestCase):
+
+    def test_threshold(self):
+        baseline = {"stages": {"inline": 1.0, "blocks": 1.0, "old": 1.0}}
+        current = {"stages": {"inline": 1.05, "blocks": 1.5, "new": 1.0}}
+        with redirect_stdout(StringIO()) as out:
+            regressions = bench.compare_results(baseline, current, 0.1)
+        self.assertEqual(regressions, ["blocks"])
+        self.assertIn("REGRESSION", out.getvalue())
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_reports_import_and_first_page(self):
+        with redirect_stdout(StringIO()) as out:
+            bench.main_cli(["startup", "--repeat", "1"])
+        self.assertIn("import:", out.getvalue())
+        self.assertIn("first page:", out.getvalue())
+        # Importing main must not load any optional feature module.
+        self.assertIn("eager: none", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+import main
+from blockcache import BlockCache
+from htmlnode import RawNode
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def test_cached_render_matches_uncached(self):
+        markdown = "# Title\n\nSome **bold** [link](/x)\n\n* a\n* b\n\nSome **bold** [link](/x)"
+        cache = BlockCache()
+        expected = main.markdown_to_html_node(markdown).to_html()
+        self.assertEqual(main.markdown_to_html_node(markdown, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(main.markdown_to_html_node(markdown, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_render_skips_parsing_on_hit(self):
+        cache = BlockCache()
+        calls = []
+
+        def render_block(block):
+            calls.append(block)
+            return main.block_to_html_node(block)
+
+        first = cache.render("*a*", render_block)
+        second = cache.render("*a*", render_block)
+        self.assertEqual(calls, ["*a*"])
+        self.assertIsInstance(second, RawNode)
+        self.assertEqual(first.to_html(), "<p><i>a</i></p>")
+        self.assertEqual(second.to_html(), first.to_html())
+
+    def test_lru_eviction(self):
+        cache = BlockCache(maxsize=2)
+        for block in ("a", "b", "a", "c"):
+            cache.render(block, main.block_to_html_node)
+        self.assertEqual(len(cache.entries), 2)
+        self.assertIn(cache.key("a"), cache.entries)
+        self.assertNotIn(cache.key("b"), cache.entries)
+
+    def test_disk_tier_survives_between_caches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "blocks.sqlite")
+            cache = BlockCache(path=path)
+            cache.render("`code`", main.block_to_html_node)
+            cache.flush()
+            other = BlockCache(path=path)
+            node = other.render("`code`", lambda block: self.fail("block was re-parsed"))
+            self.assertEqual(node.to_html(), "<p><code>code</code></p>")
+            self.assertEqual(other.drain_counters(), {"hits": 1, "disk_hits": 1, "misses": 0})
+            self.assertEqual(other.hits, 0)
+            other.clear()
+            self.assertIsNone(BlockCache(path=path).get(cache.key("`code`")))
+
+
+if __name__ == "__main__":
+    unittest.main()
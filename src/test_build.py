@@ -0,0 +1,170 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+import main
+
+
+class TestIncrementalBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "post"))
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\nWorld")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def build(self):
+        with redirect_stdout(StringIO()) as out:
+            build.build_incremental(
+                self.content, self.template, self.static, self.public, self.manifest
+            )
+        return out.getvalue()
+
+    def test_first_build_generates_everything(self):
+        out = self.build()
+        self.assertIn("Pages: 2 generated, 0 unchanged, 0 removed, 0 failed", out)
+        self.assertIn("Static assets: 2 copied, 0 removed", out)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "post", "index.html")),
+            "<title>Post\n</title><div><h1>Post</h1><p>World</p></div>",
+        )
+
+    def test_unchanged_build_does_nothing(self):
+        self.build()
+        out = self.build()
+        self.assertIn("Pages: 0 generated, 2 unchanged, 0 removed, 0 failed", out)
+        self.assertIn("Static assets: 0 copied, 0 removed", out)
+
+    def test_only_changed_page_is_generated(self):
+        self.build()
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\nEdited")
+        out = self.build()
+        self.assertIn("Pages: 1 generated, 1 unchanged, 0 removed, 0 failed", out)
+        self.assertIn("Edited", self.read(os.path.join(self.public, "post", "index.html")))
+
+    def test_template_change_regenerates_all(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        out = self.build()
+        self.assertIn("Pages: 2 generated, 0 unchanged, 0 removed, 0 failed", out)
+
+    def test_removed_sources_are_deleted(self):
+        self.build()
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        out = self.build()
+        self.assertIn("Pages: 0 generated, 1 unchanged, 1 removed, 0 failed", out)
+        self.assertIn("Static assets: 0 copied, 1 removed", out)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        out = self.build()
+        self.assertIn("Pages: 1 generated, 1 unchanged, 0 removed, 0 failed", out)
+
+
+    def test_failed_page_is_reported_and_retried(self):
+        self.write(os.path.join(self.content, "post", "index.md"), "no title")
+        out = self.build()
+        self.assertIn("Failed to generate", out)
+        self.assertIn("Pages: 1 generated, 0 unchanged, 0 removed, 1 failed", out)
+        self.write(os.path.join(self.content, "post", "index.md"), "# Fixed")
+        out = self.build()
+        self.assertIn("Pages: 1 generated, 1 unchanged, 0 removed, 0 failed", out)
+
+
+class TestParallelBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.content = os.path.join(self.root, "content")
+        for i in range(8):
+            directory = os.path.join(self.content, f"page{i}")
+            os.makedirs(directory)
+            with open(os.path.join(directory, "index.md"), "w") as f:
+                f.write(f"# Page {i}\n\nSome **bold** and [a link](/page{i + 1})")
+        with open(os.path.join(self.content, "broken.md"), "w") as f:
+            f.write("no heading here")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, dest, workers):
+        pages = main.collect_pages(self.content, self.template, dest)
+        with redirect_stdout(StringIO()):
+            failures = build.generate_pages(pages, workers)
+        outputs = {}
+        for root, _, files in os.walk(dest):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    outputs[os.path.relpath(path, dest)] = f.read()
+        return failures, outputs
+
+    def test_parallel_matches_serial(self):
+        serial_failures, serial = self.render(os.path.join(self.root, "serial"), 1)
+        parallel_failures, parallel = self.render(os.path.join(self.root, "parallel"), 4)
+        self.assertEqual(len(serial), 8)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(serial_failures, parallel_failures)
+
+    def test_failure_is_reported_per_page(self):
+        failures, outputs = self.render(os.path.join(self.root, "out"), 4)
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0][0].endswith("broken.md"))
+        self.assertIn("No header found", failures[0][1])
+        self.assertEqual(len(outputs), 8)
+
+    def test_spawned_workers_get_the_parent_settings(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        from resolve import LINK_RESOLVER
+
+        LINK_RESOLVER.enabled, LINK_RESOLVER.dest_dir = True, "out"
+        try:
+            settings = build.worker_settings()
+            # A spawned worker imports build from scratch, so anything it
+            # reports came through the initializer.
+            with ProcessPoolExecutor(
+                1, multiprocessing.get_context("spawn"),
+                initializer=build.init_worker, initargs=(settings,),
+            ) as pool:
+                self.assertEqual(pool.submit(build.worker_settings).result(), settings)
+        finally:
+            LINK_RESOLVER.enabled, LINK_RESOLVER.dest_dir = False, "public"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+import main
+from catalog import CATALOG, newest_first
+from frontmatter import read_front_matter, split_front_matter
+
+PAGE = "---\ntitle: First\ndate: 2024-03-01\ntags: [a, b]\n---\n# Heading\n\nBody\n"
+
+
+class TestFrontMatter(unittest.TestCase):
+
+    def test_split(self):
+        meta, content = split_front_matter(PAGE)
+        self.assertEqual(meta, {"title": "First", "date": "2024-03-01", "tags": ["a", "b"]})
+        self.assertEqual(content, "# Heading\n\nBody\n")
+        self.assertEqual(split_front_matter("# Plain\n"), ({}, "# Plain\n"))
+
+    def test_read_leaves_file_after_block(self):
+        f = StringIO("---\ntags: x, y\n---\n# T\n")
+        self.assertEqual(read_front_matter(f), {"tags": ["x", "y"]})
+        self.assertEqual(f.read(), "# T\n")
+
+    def test_thematic_breaks_are_content(self):
+        for text in ("---\ntitle: x\n", "---\nno colon\n---\n", "---\n\nText\n"):
+            self.assertEqual(split_front_matter(text), ({}, text))
+        f = StringIO("---\n# T\n")
+        self.assertEqual(read_front_matter(f), {})
+        self.assertEqual(f.read(), "---\n# T\n")
+
+    def test_invalid_date_is_reported(self):
+        with redirect_stdout(StringIO()) as out:
+            meta, content = split_front_matter("---\ndate: soon\ntitle: x\n---\n# T\n", "a.md")
+        self.assertEqual((meta, content), ({"title": "x"}, "# T\n"))
+        self.assertEqual(out.getvalue(), "Invalid date in a.md: 'soon'\n")
+
+    def test_newest_first(self):
+        entries = [
+            {"title": "b", "date": None}, {"title": "a", "date": "2024-01-01"},
+            {"title": "c", "date": "2024-02-01"}, {"title": "a", "date": None},
+        ]
+        self.assertEqual(
+            [entry["title"] for entry in newest_first(entries)], ["c", "a", "a", "b"]
+        )
+
+
+class TestCatalogBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog", "one"))
+        os.makedirs(os.path.join(self.content, "blog", "two"))
+        os.makedirs(self.static)
+        self.write(self.template, "{{ Title }}|{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n")
+        self.write(os.path.join(self.content, "blog", "one", "index.md"), PAGE)
+        self.write(
+            os.path.join(self.content, "blog", "two", "index.md"),
+            "---\ndate: 2024-05-02\n---\n# Second\n",
+        )
+        CATALOG.enabled = True
+        CATALOG.site_url = "https://example.org"
+
+    def tearDown(self):
+        CATALOG.enabled = False
+        CATALOG.site_url = ""
+        self.reset()
+        self.tmp.cleanup()
+
+    def reset(self):
+        # Each build starts from what a fresh process would have.
+        CATALOG.pages, CATALOG.listings = {}, {}
+        CATALOG.drain()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts)) as f:
+            return f.read()
+
+    def build(self):
+        self.reset()
+        with redirect_stdout(StringIO()) as out:
+            build.build_incremental(
+                self.content, self.template, self.static, self.public, self.manifest
+            )
+        return out.getvalue()
+
+    def test_pages_listings_and_feeds(self):
+        self.assertIn("3 pages, 1 listings, 3 files written", self.build())
+        self.assertTrue(self.read("blog", "one", "index.html").startswith("First|<div><h1>"))
+        listing = self.read("blog", "index.html")
+        self.assertLess(listing.index("/blog/two"), listing.index("/blog/one"))
+        self.assertIn(
+            "<loc>https://example.org/blog/one</loc><lastmod>2024-03-01</lastmod>",
+            self.read("sitemap.xml"),
+        )
+        feed = self.read("feed.xml")
+        self.assertIn("<title>Home</title>", feed)
+        self.assertIn("<pubDate>Fri, 01 Mar 2024 00:00:00 +0000</pubDate>", feed)
+        self.assertIn("<category>a</category><category>b</category>", feed)
+
+    def test_unchanged_build_writes_nothing(self):
+        self.build()
+        self.assertIn("0 files written", self.build())
+
+    def test_listing_follows_page_changes(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "two", "index.md"))
+        self.build()
+        self.assertNotIn("/blog/two", self.read("blog", "index.html"))
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n")
+        self.assertIn("0 listings", self.build())
+        self.assertTrue(self.read("blog", "index.html").startswith("Blog\n|"))
+
+    def test_directories_of_directories_are_listed(self):
+        os.makedirs(os.path.join(self.content, "docs", "guide"))
+        self.write(os.path.join(self.content, "docs", "guide", "index.md"), "# Guide\n")
+        self.assertIn("2 listings", self.build())
+        self.assertIn('<a href="/docs/guide">Guide</a>', self.read("docs", "index.html"))
+        os.makedirs(os.path.join(self.content, "docs", "api"))
+        self.write(os.path.join(self.content, "docs", "api", "index.md"), "# API\n")
+        self.build()
+        listing = self.read("docs", "index.html")
+        self.assertIn('<a href="/docs/api">API</a>', listing)
+        self.assertIn('<a href="/docs/guide">Guide</a>', listing)
+        os.makedirs(os.path.join(self.content, "docs", "api", "v1"))
+        os.rename(
+            os.path.join(self.content, "docs", "api", "index.md"),
+            os.path.join(self.content, "docs", "api", "v1", "index.md"),
+        )
+        self.build()
+        self.assertIn('<a href="/docs/api">api/</a>', self.read("docs", "index.html"))
+        self.assertIn('<a href="/docs/api/v1">API</a>', self.read("docs", "api", "index.html"))
+        os.makedirs(os.path.join(self.content, "docs", "more", "deep"))
+        self.write(os.path.join(self.content, "docs", "more", "deep", "index.md"), "# Deep\n")
+        self.build()
+        self.assertIn('<a href="/docs/more">more/</a>', self.read("docs", "index.html"))
+
+    def test_generate_page_records_metadata(self):
+        CATALOG.drain()
+        dest = os.path.join(self.public, "blog", "one")
+        os.makedirs(dest)
+        with redirect_stdout(StringIO()):
+            main.generate_page(
+                os.path.join(self.content, "blog", "one", "index.md"), self.template, dest
+            )
+        recorded = CATALOG.drain()
+        entry = recorded[os.path.join(self.content, "blog", "one", "index.md")]
+        self.assertEqual((entry["title"], entry["tags"]), ("First", ["a", "b"]))
+        self.assertNotIn("---", self.read("blog", "one", "index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import gzip
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import compress
+
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.state = tempfile.TemporaryDirectory()
+        self.write("index.html", "<p>hello</p>" * 500)
+        self.write("small.css", "body {}")
+        self.write("image.png", "x" * 5000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        self.state.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), "w") as f:
+            f.write(text)
+
+    def run_compress(self, **kwargs):
+        with redirect_stdout(StringIO()) as out:
+            totals = compress.compress_outputs(
+                self.root, workers=1, formats=("gz",), state_dir=self.state.name, **kwargs
+            )
+        return totals, out.getvalue()
+
+    def test_writes_gzip_for_large_text_files(self):
+        totals, out = self.run_compress()
+        self.assertEqual(totals["files"], 1)
+        self.assertEqual(totals["written"], 1)
+        self.assertIn("saved gz", out)
+        with gzip.open(os.path.join(self.root, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 500)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+        self.assertGreater(totals["saved"]["gz"], 5000)
+
+    def test_up_to_date_outputs_are_skipped(self):
+        first, _ = self.run_compress()
+        second, _ = self.run_compress()
+        self.assertEqual((second["written"], second["skipped"]), (0, 1))
+        self.assertEqual(second["saved"], first["saved"])
+        self.write("index.html", "<p>changed</p>" * 500)
+        os.utime(os.path.join(self.root, "index.html.gz"), ns=(0, 0))
+        third, _ = self.run_compress()
+        self.assertEqual(third["written"], 1)
+
+    def test_min_size_and_stale_removal(self):
+        totals, _ = self.run_compress(min_size=1)
+        self.assertEqual(totals["files"], 2)
+        os.remove(os.path.join(self.root, "index.html"))
+        totals, _ = self.run_compress(min_size=1)
+        self.assertEqual(totals["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "index.html.gz")))
+
+    def test_only_outputs_of_this_stage_are_removed(self):
+        with open(os.path.join(self.root, "data.json.gz"), "wb") as f:
+            f.write(gzip.compress(b"{}"))
+        self.run_compress()
+        self.write("index.html", "<p>short</p>")
+        totals, _ = self.run_compress()
+        self.assertEqual(totals["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "index.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "data.json.gz")))
+        self.assertNotIn(compress.COMPRESS_MANIFEST, os.listdir(self.root))
+
+    def test_process_pool(self):
+        for i in range(4):
+            self.write(f"page{i}.html", f"<p>{i}</p>" * 400)
+        with redirect_stdout(StringIO()):
+            totals = compress.compress_outputs(
+                self.root, workers=2, formats=("gz",), state_dir=self.state.name
+            )
+        self.assertEqual(totals["written"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
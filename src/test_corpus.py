@@ -0,0 +1,30 @@
+import random
+import tempfile
+import unittest
+
+import corpus
+import main
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_seeded_pages_are_reproducible(self):
+        first = corpus.random_page(random.Random(3), "Title")
+        second = corpus.random_page(random.Random(3), "Title")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, corpus.random_page(random.Random(4), "Title"))
+
+    def test_generated_corpus_renders(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = corpus.generate_corpus(root, pages=5, seed=1, depth=2, blocks=10)
+            self.assertEqual(len(paths), 5)
+            for path in paths:
+                self.assertTrue(path.startswith(root))
+                with open(path) as f:
+                    markdown = f.read()
+                self.assertTrue(markdown.startswith("# Page "))
+                main.markdown_to_html_node(markdown).to_html()
+
+
+if __name__ == "__main__":
+    unittest.main()
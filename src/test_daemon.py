@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import daemon
+import main
+
+
+class TestBuildDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "post"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello\n\n* a\n* b")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\nWorld")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.daemon = daemon.BuildDaemon(
+            self.content, self.template, self.static, self.public,
+            os.path.join(self.root, ".build", "manifest.json"),
+        )
+        with redirect_stdout(StringIO()):
+            self.daemon.start()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def expected(self, source):
+        title, content, _ = main.read_page(source)
+        return main.render_page(title, content, self.template)
+
+    def test_rebuilds_only_named_pages(self):
+        home = os.path.join(self.content, "index.md")
+        self.write(home, "# Home\n\nChanged\n\n* a\n* b")
+        response = self.daemon.rebuild([home])
+        self.assertEqual(response["generated"], [home])
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")), self.expected(home)
+        )
+
+    def test_unchanged_blocks_are_reused(self):
+        home = os.path.join(self.content, "index.md")
+        kept = self.daemon.trees[home]["* a\n* b"]
+        self.write(home, "# Home\n\nChanged\n\n* a\n* b")
+        self.daemon.rebuild([home])
+        self.assertIs(self.daemon.trees[home]["* a\n* b"], kept)
+        self.assertNotIn("Hello", self.daemon.trees[home])
+
+    def test_detects_changes_without_paths(self):
+        post = os.path.join(self.content, "post", "index.md")
+        self.write(post, "# Post\n\nAgain and again")
+        os.remove(os.path.join(self.static, "index.css"))
+        response = self.daemon.rebuild()
+        self.assertEqual(response["generated"], [post])
+        self.assertEqual(response["assets"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_template_and_removed_pages(self):
+        post = os.path.join(self.content, "post", "index.md")
+        os.remove(post)
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        response = self.daemon.rebuild([post, self.template])
+        self.assertEqual(response["removed"], [post])
+        self.assertEqual(response["generated"], [os.path.join(self.content, "index.md")])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+        self.assertTrue(self.read(os.path.join(self.public, "index.html")).startswith("<h1>"))
+
+    def test_directories_stand_for_their_files(self):
+        post_dir = os.path.join(self.content, "post")
+        os.makedirs(os.path.join(post_dir, "deep"))
+        deep = os.path.join(post_dir, "deep", "index.md")
+        self.write(deep, "# Deep\n\nNew")
+        os.makedirs(os.path.join(self.static, "img"))
+        self.write(os.path.join(self.static, "img", "a.css"), "a {}")
+        response = self.daemon.rebuild([post_dir, self.static])
+        self.assertEqual(
+            response["generated"], [deep, os.path.join(post_dir, "index.md")]
+        )
+        self.assertEqual(response["assets"], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "post", "deep", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "img", "a.css")))
+        shutil.rmtree(os.path.join(self.static, "img"))
+        shutil.rmtree(post_dir)
+        response = self.daemon.rebuild([post_dir, os.path.join(self.static, "img")])
+        self.assertEqual(response["removed"], [deep, os.path.join(post_dir, "index.md")])
+        self.assertEqual(response["assets"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "img", "a.css")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "post", "index.html")))
+
+    def test_socket_round_trip(self):
+        socket_path = os.path.join(self.root, "daemon.sock")
+        self.daemon.start = lambda: None
+        with redirect_stdout(StringIO()):
+            thread = threading.Thread(target=daemon.serve, args=(self.daemon, socket_path))
+            thread.start()
+            try:
+                for _ in range(100):
+                    if os.path.exists(socket_path):
+                        break
+                    time.sleep(0.01)
+                status = daemon.send_request({"command": "status"}, socket_path)
+                self.assertEqual(status["pages"], 2)
+                error = daemon.send_request({"command": "nope"}, socket_path)
+                self.assertFalse(error["ok"])
+            finally:
+                daemon.send_request({"command": "shutdown"}, socket_path)
+                thread.join()
+        self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
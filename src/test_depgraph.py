@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+from depgraph import DependencyGraph, new_page_info, normalize_url, record_targets
+from htmlnode import RawNode
+from main import markdown_to_html_node
+
+
+class TestRecordTargets(unittest.TestCase):
+
+    def test_links_and_images_are_collected(self):
+        info = new_page_info()
+        node = markdown_to_html_node(
+            "[home](/) and ![logo](/images/logo.png)\n\n- [post](/post)"
+        )
+        record_targets(node, info)
+        self.assertEqual(info["links"], ["/", "/post"])
+        self.assertEqual(info["images"], ["/images/logo.png"])
+
+    def test_cached_blocks_are_parsed(self):
+        info = new_page_info()
+        record_targets(RawNode('<p><a href="/a">a</a><img href="b.png" alt="b"></img></p>'), info)
+        self.assertEqual(info, {"links": ["/a"], "images": ["b.png"]})
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url("../other/index.html#top", "/post/"), "/other")
+        self.assertEqual(normalize_url("/", "/post/"), "/")
+        self.assertEqual(normalize_url("img.png?v=1", "/post/"), "/post/img.png")
+
+    def test_external_targets_are_skipped(self):
+        graph = DependencyGraph()
+        info = {"links": ["https://example.com", "mailto:a@b", "#top", "/post"], "images": []}
+        graph.update("content/index.md", "/", info)
+        self.assertEqual(graph.pages["content/index.md"]["links"], ["/post"])
+
+    def test_dependents_and_broken_links(self):
+        graph = DependencyGraph()
+        graph.update("a.md", "/", {"links": ["/b"], "images": ["/x.png"]})
+        graph.update("b.md", "/b", {"links": ["/"], "images": []})
+        self.assertEqual(graph.dependents(["/b"]), ["a.md"])
+        self.assertEqual(graph.broken_links(["/x.png"]), [])
+        graph.remove("b.md")
+        self.assertEqual(graph.broken_links([]), [("a.md", "/b"), ("a.md", "/x.png")])
+
+
+class TestIncrementalLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "post"))
+        os.makedirs(self.static)
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/post)")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\n![a](../a.png)")
+        self.write(os.path.join(self.static, "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def build(self):
+        with redirect_stdout(StringIO()) as out:
+            build.build_incremental(
+                self.content, self.template, self.static, self.public, self.manifest
+            )
+            broken = build.report_broken_links(self.manifest)
+        return out.getvalue(), broken
+
+    def test_graph_is_saved(self):
+        _, broken = self.build()
+        self.assertEqual(broken, [])
+        graph = DependencyGraph.load(build.graph_path(self.manifest))
+        post = os.path.join(self.content, "post", "index.md")
+        self.assertEqual(graph.pages[post]["images"], ["/a.png"])
+
+    def test_removed_targets_flag_only_referencing_pages(self):
+        self.build()
+        os.remove(os.path.join(self.static, "a.png"))
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        out, broken = self.build()
+        self.assertIn("Pages: 0 generated, 1 unchanged, 1 removed, 0 failed", out)
+        home = os.path.join(self.content, "index.md")
+        self.assertIn(f"Broken link in {home}: /post was removed", out)
+        self.assertEqual(broken, [(home, "/post")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.state = os.path.join(self.tmp.name, ".build", "outputs")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.public, "images"))
+        os.makedirs(os.path.join(self.public, "post"))
+        self.asset("index.css", "body {}")
+        self.asset("images/a.png", "png")
+        self.page(
+            "index.html",
+            '<link href="/index.css" rel="stylesheet"><img href="/images/a.png">'
+            '<a href="https://example.com/index.css">x</a><a href="/post">post</a>',
+        )
+        self.page("post/index.html", '<img src="../images/a.png?v=1">')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def asset(self, rel_path, text):
+        for root in (self.static, self.public):
+            with open(os.path.join(root, rel_path), "w") as f:
+                f.write(text)
+
+    def page(self, rel_path, text):
+        with open(os.path.join(self.public, rel_path), "w") as f:
+            f.write(text)
+
+    def read(self, rel_path):
+        with open(os.path.join(self.public, rel_path)) as f:
+            return f.read()
+
+    def fingerprint(self):
+        return fingerprint.fingerprint_assets(self.static, self.public, state_dir=self.state)
+
+    def run_fingerprint(self):
+        with redirect_stdout(StringIO()):
+            return self.fingerprint()
+
+    def test_names_manifest_and_rewrites(self):
+        manifest = self.run_fingerprint()
+        css = manifest["index.css"]
+        png = manifest["images/a.png"]
+        self.assertRegex(css, r"^index\.[0-9a-f]{8}\.css$")
+        self.assertRegex(png, r"^images/a\.[0-9a-f]{8}\.png$")
+        self.assertEqual(self.read(css), "body {}")
+        index = self.read("index.html")
+        self.assertIn(f'href="/{css}"', index)
+        self.assertIn(f'href="/{png}"', index)
+        self.assertIn('href="https://example.com/index.css"', index)
+        self.assertIn('href="/post"', index)
+        self.assertEqual(self.read("post/index.html"), f'<img src="/{png}?v=1">')
+        with open(os.path.join(self.public, "asset-manifest.json")) as f:
+            self.assertEqual(json.load(f), manifest)
+        self.assertNotIn(fingerprint.PAGES_FILE, os.listdir(self.public))
+        self.assertTrue(
+            os.path.exists(fingerprint.state_path(self.public, fingerprint.PAGES_FILE, self.state))
+        )
+        headers = self.read("_headers")
+        self.assertIn(f"/{css}\n  Cache-Control: public, max-age=31536000, immutable", headers)
+
+    def test_changed_asset_updates_old_references(self):
+        old = self.run_fingerprint()["index.css"]
+        self.asset("index.css", "body { color: red }")
+        new = self.run_fingerprint()["index.css"]
+        self.assertNotEqual(old, new)
+        self.assertIn(f'href="/{new}"', self.read("index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+
+    def test_only_changed_pages_are_rewritten(self):
+        with redirect_stdout(StringIO()) as out:
+            self.fingerprint()
+            self.fingerprint()
+        self.assertIn("rewrote 0 pages", out.getvalue().splitlines()[1])
+        self.page("post/index.html", '<img src="/images/a.png">')
+        self.asset("index.css", "body { color: blue }")
+        with redirect_stdout(StringIO()) as out:
+            manifest = self.fingerprint()
+        self.assertIn("rewrote 2 pages", out.getvalue())
+        self.assertIn(manifest["index.css"], self.read("index.html"))
+
+    def test_hardlinked_pages_are_not_written_through(self):
+        source = os.path.join(self.static, "about.html")
+        with open(source, "w") as f:
+            f.write('<link href="/index.css">')
+        os.link(source, os.path.join(self.public, "about.html"))
+        manifest = self.run_fingerprint()
+        self.assertIn(manifest["index.css"], self.read("about.html"))
+        with open(source) as f:
+            self.assertEqual(f.read(), '<link href="/index.css">')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from io import StringIO
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 class TestHTMLNode(unittest.TestCase):
@@ -19,6 +20,14 @@ class TestHTMLNode(unittest.TestCase):
         self.assertNotEqual(node, node2)
 
         
+    def test_slots(self):
+        node = ParentNode("p", [LeafNode("x", "".join(["c", "ode"]))])
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertFalse(hasattr(node.children[0], "__dict__"))
+        self.assertIs(node.children[0].tag, "code")
+        self.assertIsNone(LeafNode("x").props)
+
+
 class TestLeafNode(unittest.TestCase):
 
     def test_eq(self):
@@ -57,4 +66,33 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             node.to_html()
 
-        
+    def test_deep_tree(self):
+        node = LeafNode("x")
+        for _ in range(5000):
+            node = ParentNode(tag="b", children=[node])
+        self.assertEqual(node.to_html(), "<b>" * 5000 + "x" + "</b>" * 5000)
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode("a "), LeafNode("b", "b"), LeafNode(" c")]),
+            LeafNode("link", "a", {"href": "/x"}),
+        ])
+        sink = StringIO()
+        node.write_html(sink, buffer_size=4)
+        self.assertEqual(sink.getvalue(), node.to_html())
+        self.assertEqual(
+            list(node.iter_html()),
+            ["<div>", "<p>", "a ", "<b>b</b>", " c", "</p>", "<a href=\"/x\">link</a>", "</div>"],
+        )
+
+    def test_invalid_child_raises(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.write_html(StringIO())
+
+    def test_generator_children(self):
+        node = ParentNode("ul", (LeafNode(str(i), "li") for i in range(3)))
+        self.assertEqual(node.to_html(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
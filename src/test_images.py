@@ -0,0 +1,165 @@
+import os
+import struct
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import images
+
+
+class TestImageSize(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return images.image_size(path)
+
+    def test_headers(self):
+        png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480)
+        gif = b"GIF89a" + struct.pack("<HH", 32, 16)
+        jpeg = (
+            b"\xff\xd8"
+            + b"\xff\xe0" + struct.pack(">H", 4) + b"JF"
+            + b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 200, 300)
+        )
+        self.assertEqual(self.size("a.png", png + bytes(16)), (640, 480))
+        self.assertEqual(self.size("a.gif", gif + bytes(20)), (32, 16))
+        self.assertEqual(self.size("a.jpg", jpeg + bytes(20)), (300, 200))
+        self.assertIsNone(self.size("a.txt", b"not an image" * 4))
+        self.assertIsNone(self.size("short.jpg", jpeg[:-3]))
+        self.assertIsNone(self.size("short.png", png[:20]))
+
+
+class TestMarkup(unittest.TestCase):
+
+    META = {
+        "width": 1000,
+        "height": 500,
+        "variants": [[480, 240, ".png", "480.png"], [480, 240, ".webp", "480.webp"]],
+    }
+
+    def test_derivative_name(self):
+        self.assertEqual(images.derivative_name("images/a.png", 480), "images/a.480w.png")
+        self.assertEqual(images.derivative_name("a.png", 480, ".webp"), "a.480w.webp")
+
+    def test_markup(self):
+        self.assertEqual(
+            images.image_markup("/a.png", self.META, "alt"),
+            '<picture><source type="image/webp" srcset="/a.480w.webp 480w" sizes="100vw">'
+            '<img href="/a.png" srcset="/a.480w.png 480w, /a.png 1000w" sizes="100vw" '
+            'width="1000" height="500">alt</img></picture>',
+        )
+
+    def test_rewrite_is_idempotent(self):
+        html = '<p><img href="a.png">alt</img><img href="https://e.org/b.png">b</img></p>'
+        once = images.rewrite_images(html, "post", {"post/a.png": self.META})
+        self.assertIn('width="1000"', once)
+        self.assertIn('<img href="https://e.org/b.png">b</img>', once)
+        self.assertEqual(images.rewrite_images(once, "post", {"post/a.png": self.META}), once)
+        plain = dict(self.META, variants=[])
+        self.assertEqual(
+            images.rewrite_images(once, "post", {"post/a.png": plain}),
+            '<p><img href="a.png" width="1000" height="500">alt</img>'
+            '<img href="https://e.org/b.png">b</img></p>',
+        )
+
+
+@unittest.skipIf(images.Image is None, "Pillow is not installed")
+class TestProcessImages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        self.state = os.path.join(self.tmp.name, ".build", "outputs")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.public)
+        for name, width in (("a.png", 1000), ("b.jpg", 600)):
+            images.Image.new("RGB", (width, width // 2)).save(
+                os.path.join(self.static, "images", name)
+            )
+        with open(os.path.join(self.public, "index.html"), "w") as f:
+            f.write('<img href="/images/a.png">a</img><img href="images/b.jpg">b</img>')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_images(self, webp=False):
+        with redirect_stdout(StringIO()) as out:
+            result = images.process_images(
+                self.static, self.public, 2, (480, 960), webp, cache_dir=self.cache,
+                state_dir=self.state,
+            )
+        return result, out.getvalue()
+
+    def test_derivatives_are_published_and_cached(self):
+        result, out = self.run_images()
+        self.assertIn("2 referenced, 3 derivatives, 0 broken, rewrote 1 pages", out)
+        self.assertEqual(result["images/b.jpg"]["variants"], [[480, 240, ".jpg", "480.jpg"]])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "images", "a.960w.png")))
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertIn('width="600" height="300"', f.read())
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+        self.assertNotIn(images.IMAGE_MANIFEST, os.listdir(self.public))
+        _, out = self.run_images()
+        self.assertIn("rewrote 0 pages", out)
+
+    def test_stale_derivatives_are_removed(self):
+        self.run_images(webp=True)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "images", "a.480w.webp")))
+        self.run_images()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "a.480w.webp")))
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertNotIn("<picture>", f.read())
+
+    def test_broken_image_is_reported_and_left_alone(self):
+        with open(os.path.join(self.static, "images", "a.png"), "r+b") as f:
+            f.truncate(200)
+        result, out = self.run_images()
+        self.assertIn("Broken image in index.html: /images/a.png (OSError", out)
+        self.assertNotIn("images/a.png", result)
+        with open(os.path.join(self.public, "index.html")) as f:
+            html = f.read()
+        self.assertIn('<img href="/images/a.png">a</img>', html)
+        self.assertIn('width="600"', html)
+
+    def test_unchanged_pages_are_not_rewritten(self):
+        page = os.path.join(self.public, "index.html")
+        source = os.path.join(self.tmp.name, "index.html")
+        os.replace(page, source)
+        os.link(source, page)
+        self.run_images()
+        with open(source) as f:
+            self.assertNotIn("srcset", f.read())
+        _, out = self.run_images()
+        self.assertIn("rewrote 0 pages", out)
+        os.utime(os.path.join(self.static, "images", "b.jpg"), ns=(0, 0))
+        _, out = self.run_images()
+        self.assertIn("rewrote 0 pages", out)
+
+    def test_fingerprinted_references_keep_their_derivatives(self):
+        self.run_images()
+        with open(os.path.join(self.public, "asset-manifest.json"), "w") as f:
+            f.write('{"images/a.png": "images/a.0123abcd.png"}')
+        page = os.path.join(self.public, "index.html")
+        with open(page) as f:
+            html = f.read().replace('href="/images/a.png"', 'href="/images/a.0123abcd.png"')
+        with open(page, "w") as f:
+            f.write(html)
+        result, out = self.run_images()
+        self.assertIn("images/a.png", result)
+        self.assertIn("rewrote 0 pages", out)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "images", "a.480w.png")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import main
+from inline import tokenize_inline
+from textnode import TextNode, TextType
+
+
+def chained(text):
+    nodes = main.split_nodes_delimiter([TextNode(text, TextType.NORMAL)], "**", TextType.BOLD)
+    nodes = main.split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = main.split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = main.split_nodes_link(nodes)
+    return main.split_nodes_image(nodes)
+
+
+class TestTokenizeInline(unittest.TestCase):
+
+    def test_matches_chained_splitters(self):
+        inputs = [
+            "This is **text** with an *italic* word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+            "This text has an ![image](www.google.com/image.jpg) and another ![image](www.boot.dev/weird.gif)",
+            "[image](www.google.com/image.jpg)[image](www.boot.dev/weird.gif)",
+            "**I like Tolkien**. Read my [first post here](/majesty)",
+            "Disney *didn't ruin it*",
+            "a ***mixed*** bag with `code *inside*` and **bold `tick`**",
+            "unbalanced **bold and *italic and `code",
+            "**[bold link](/bold)** and `[code link](/code)`",
+            "",
+        ]
+        for text in inputs:
+            self.assertEqual(tokenize_inline(text), chained(text), text)
+
+    def test_text_to_textnodes_uses_tokenizer(self):
+        self.assertEqual(
+            main.text_to_textnodes("a [b](c) d"),
+            [
+                TextNode("a ", TextType.NORMAL),
+                TextNode("b", TextType.LINKS, "c"),
+                TextNode(" d", TextType.NORMAL),
+            ],
+        )
+
+    def test_long_link_run(self):
+        text = "".join(f"[l{i}](/p{i}) " for i in range(5000))
+        nodes = tokenize_inline(text)
+        self.assertEqual(len(nodes), 10000)
+        self.assertEqual(nodes[-2], TextNode("l4999", TextType.LINKS, "/p4999"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,8 @@
+import io
+import os
+import tempfile
 import unittest
+from contextlib import redirect_stderr, redirect_stdout
 from htmlnode import LeafNode, HTMLNode, ParentNode
 import main
 from textnode import TextNode, TextType
@@ -227,3 +231,150 @@ End
                        ParentNode("blockquote", [LeafNode("GRRRREAAT")]), 
                        ParentNode("p", [LeafNode("End")])])
         self.assertEqual(output, expected)
+
+
+class TestClassifyBlock(unittest.TestCase):
+    def test_types_and_lines(self):
+        cases = [
+            ("### heading", main.block_type_heading, None),
+            ("####### not a heading", main.block_type_paragraph, None),
+            ("```\ncode\n```", main.block_type_code, None),
+            ("```single line```", main.block_type_paragraph, None),
+            ("> a\n> b", main.block_type_quote, ["> a", "> b"]),
+            ("> a\nb", main.block_type_paragraph, None),
+            ("* a\n* b", main.block_type_ulist, ["* a", "* b"]),
+            ("- a\n* b", main.block_type_paragraph, None),
+            ("*", main.block_type_paragraph, None),
+            ("1. a\n2. b\n3. c", main.block_type_olist, ["1. a", "2. b", "3. c"]),
+            ("1. a\n3. b", main.block_type_paragraph, None),
+            ("plain", main.block_type_paragraph, None),
+        ]
+        for block, block_type, lines in cases:
+            self.assertEqual(main.classify_block(block), (block_type, lines), block)
+            self.assertEqual(main.block_to_block_type(block), block_type)
+
+    def test_long_ordered_list(self):
+        block = "\n".join(f"{i}. item" for i in range(1, 120))
+        node = main.block_to_html_node(block)
+        self.assertEqual(len(node.children), 119)
+
+
+class TestStreamingBlocks(unittest.TestCase):
+    def test_iter_markdown_blocks_matches_split(self):
+        inputs = [
+            "# a\n\nb\n\n\nc\n\n\n\nd\n\n\n\n\n e \n",
+            "x\n\n\n",
+            "\n\n\n\nonly\n",
+            "",
+        ]
+        for markdown in inputs:
+            for chunk_size in (1, 2, 3, 1 << 16):
+                blocks = list(main.iter_markdown_blocks(io.StringIO(markdown), chunk_size))
+                self.assertEqual(blocks, main.markdown_to_blocks(markdown), (markdown, chunk_size))
+
+    def test_long_paragraph_is_not_rebuilt_per_chunk(self):
+        # Chunks count the times they are concatenated onto earlier text; a
+        # block rebuilt that way is copied and rescanned once per chunk.
+        class Chunk(str):
+            concatenations = 0
+
+            def __add__(self, other):
+                Chunk.concatenations += 1
+                return str(self) + other
+
+            def __radd__(self, other):
+                Chunk.concatenations += 1
+                return other + str(self)
+
+        class Reader:
+            reads = 0
+
+            def __init__(self, text):
+                self.f = io.StringIO(text)
+
+            def read(self, size):
+                self.reads += 1
+                return Chunk(self.f.read(size))
+
+        paragraph = "word " * (4 << 17)
+        markdown = f"# Title\n\n{paragraph}\n\nEnd"
+        reader = Reader(markdown)
+        blocks = list(main.iter_markdown_blocks(reader, 1 << 12))
+        self.assertEqual(blocks, ["# Title", paragraph.strip(), "End"])
+        self.assertEqual(reader.reads, -(-len(markdown) // (1 << 12)) + 1)
+        self.assertEqual(Chunk.concatenations, 0)
+
+    def test_failed_streamed_page_keeps_previous_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            output = os.path.join(tmp, "index.html")
+            with open(source, "w") as f:
+                f.write("# Big\n\n" + "Paragraph\n\n" * 100 + "```\nx\n```abc")
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            with open(output, "w") as f:
+                f.write("last good build")
+            threshold = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = 0
+            try:
+                with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+                    main.generate_page(source, template, tmp)
+            finally:
+                main.STREAM_THRESHOLD = threshold
+            with open(output) as f:
+                self.assertEqual(f.read(), "last good build")
+            self.assertEqual(sorted(os.listdir(tmp)), ["index.html", "index.md", "template.html"])
+
+    def test_streamed_page_matches_buffered(self):
+        markdown = "# Big\n\n" + "\n\n".join(
+            f"Paragraph {i} with **bold** and [link](/{i})\n\n* a\n* b" for i in range(200)
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            with open(source, "w") as f:
+                f.write(markdown)
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            outputs = []
+            threshold = main.STREAM_THRESHOLD
+            try:
+                for main.STREAM_THRESHOLD in (1 << 30, 0):
+                    dest = os.path.join(tmp, str(main.STREAM_THRESHOLD))
+                    os.mkdir(dest)
+                    with redirect_stdout(io.StringIO()):
+                        main.generate_page(source, template, dest)
+                    with open(os.path.join(dest, "index.html")) as f:
+                        outputs.append(f.read())
+            finally:
+                main.STREAM_THRESHOLD = threshold
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertIn("Paragraph 199", outputs[1])
+
+
+class TestCli(unittest.TestCase):
+
+    def test_bare_options_mean_build(self):
+        for argv in (["--broken-links"], ["build", "--broken-links"]):
+            with redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+                main.main(argv)
+            self.assertIn("--broken-links needs --incremental", err.getvalue())
+
+    def test_client_commands_without_daemon(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = os.path.join(tmp, "daemon.sock")
+            for argv in (["rebuild"], ["rebuild", "--status"], ["daemon", "--stop"]):
+                with redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+                    main.main(argv + ["--socket", socket_path])
+                self.assertIn(f"no build daemon listening on {socket_path}", err.getvalue())
+
+    def test_io_workers_reject_process_workers(self):
+        with redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            main.main(["build", "--workers", "4", "--io-workers", "8"])
+        self.assertIn("cannot be combined with --workers", err.getvalue())
+
+    def test_image_and_link_patterns_are_shared(self):
+        text = "![a](/a.png) [b](/b)"
+        self.assertEqual(main.extract_markdown_images(text), [("a", "/a.png")])
+        self.assertEqual(main.extract_markdown_links(text), [("b", "/b")])
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+import corpus
+import main
+import pipeline
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        corpus.generate_corpus(self.content, pages=12, seed=5, depth=2, blocks=8)
+        with open(os.path.join(self.content, "broken.md"), "w") as f:
+            f.write("no heading")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def outputs(self, dest):
+        found = {}
+        for root, _, files in os.walk(dest):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path) as f:
+                    found[os.path.relpath(path, dest)] = f.read()
+        return found
+
+    def run_build(self, dest, **kwargs):
+        pages = main.collect_pages(self.content, self.template, dest)
+        with redirect_stdout(StringIO()):
+            return build.generate_pages(pages, **kwargs)
+
+    def test_matches_serial_build(self):
+        serial = os.path.join(self.root, "serial")
+        piped = os.path.join(self.root, "piped")
+        serial_failures = self.run_build(serial)
+        piped_failures = self.run_build(piped, io_workers=4)
+        self.assertEqual(len(self.outputs(serial)), 12)
+        self.assertEqual(self.outputs(serial), self.outputs(piped))
+        self.assertEqual(serial_failures, piped_failures)
+        self.assertIn("No header found", piped_failures[0][1])
+
+    def test_rejects_process_workers(self):
+        with self.assertRaises(ValueError):
+            self.run_build(os.path.join(self.root, "both"), workers=4, io_workers=4)
+
+    def test_tiny_queues(self):
+        dest = os.path.join(self.root, "tiny")
+        pages = main.collect_pages(self.content, self.template, dest)
+        with redirect_stdout(StringIO()):
+            failures = pipeline.generate_pages_pipelined(pages, io_workers=2, queue_size=1)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(len(self.outputs(dest)), 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
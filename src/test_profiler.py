@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from profiler import Profiler, PROFILER, timed
+
+
+class TestProfiler(unittest.TestCase):
+
+    def tearDown(self):
+        PROFILER.enabled = False
+        PROFILER.reset()
+
+    def test_disabled_records_nothing(self):
+        profiler = Profiler()
+        with profiler.phase("parse"), profiler.page("a.md"):
+            pass
+        sink = StringIO()
+        self.assertIs(profiler.sink(sink), sink)
+        self.assertEqual(profiler.phases, {})
+        self.assertEqual(profiler.pages, {})
+
+    def test_phases_pages_and_nesting(self):
+        profiler = Profiler()
+        profiler.enabled = True
+        with profiler.page("a.md"):
+            with profiler.phase("parse"):
+                with profiler.phase("parse"):
+                    pass
+            with profiler.phase("parse"):
+                pass
+            profiler.sink(StringIO()).write("x")
+        self.assertEqual(profiler.phases["parse"][0], 2)
+        self.assertEqual(profiler.phases["write"][0], 1)
+        self.assertIn("a.md", profiler.pages)
+        data = profiler.to_json()
+        self.assertEqual(data["pages"], 1)
+        self.assertEqual(data["slowest_pages"][0]["path"], "a.md")
+        self.assertIn("parse", profiler.report())
+
+    def test_drain_and_merge(self):
+        worker = Profiler()
+        worker.enabled = True
+        with worker.page("a.md"), worker.phase("render"):
+            pass
+        parent = Profiler()
+        parent.merge(worker.drain())
+        parent.merge({"phases": {"render": [2, 1.0]}, "pages": {"b.md": 1.0}})
+        self.assertEqual(parent.phases["render"][0], 3)
+        self.assertEqual(set(parent.pages), {"a.md", "b.md"})
+        self.assertEqual(worker.phases, {})
+
+    def test_timed_and_cprofile_dump(self):
+        @timed("double")
+        def double(x):
+            return x * 2
+
+        self.assertEqual(double(2), 4)
+        self.assertEqual(PROFILER.phases, {})
+        PROFILER.enabled = True
+        with tempfile.TemporaryDirectory() as tmp:
+            PROFILER.profile_page = "a.md"
+            PROFILER.profile_path = os.path.join(tmp, "a.prof")
+            with PROFILER.page("a.md"):
+                double(3)
+            PROFILER.profile_page = None
+            self.assertTrue(os.path.exists(os.path.join(tmp, "a.prof")))
+            PROFILER.write_json(os.path.join(tmp, "report.json"))
+            with open(os.path.join(tmp, "report.json")) as f:
+                self.assertEqual(json.load(f)["phases"]["double"]["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
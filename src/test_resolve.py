@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+import main
+from htmlnode import LeafNode, ParentNode, RawNode
+from resolve import LINK_RESOLVER, LinkResolver, canonical_url, site_urls
+
+
+class TestCanonicalUrl(unittest.TestCase):
+
+    def test_relative_targets(self):
+        self.assertEqual(canonical_url("../images/a.png", "/post/"), "/images/a.png")
+        self.assertEqual(canonical_url("other/", "/post/"), "/post/other")
+        self.assertEqual(canonical_url("../index.md#top", "/post/"), "/#top")
+        self.assertEqual(canonical_url("/a/index.html?x=1", "/post/"), "/a?x=1")
+
+
+class TestLinkResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.resolver = LinkResolver("public")
+
+    def test_rewrites_tree_and_raw_nodes(self):
+        tree = ParentNode("div", [
+            LeafNode("a", "a", {"href": "../x"}),
+            LeafNode("b", "img", {"href": "b.png"}),
+            RawNode('<p><a href="./y/index.md">y</a><a href="https://e.org">e</a></p>'),
+        ])
+        self.resolver.resolve(tree, "content/post/index.md", os.path.join("public", "post"))
+        self.assertEqual(
+            tree.to_html(),
+            '<div><a href="/x">a</a><img href="/post/b.png">b</img>'
+            '<p><a href="/post/y">y</a><a href="https://e.org">e</a></p></div>',
+        )
+        self.assertEqual(
+            self.resolver.targets["content/post/index.md"],
+            {"links": {"/x", "/post/y"}, "images": {"/post/b.png"}},
+        )
+
+    def test_broken_targets_are_checked_in_one_batch(self):
+        self.resolver.merge({"a.md": {"links": {"/", "/gone"}, "images": {"/i.png"}}})
+        self.resolver.merge({"b.md": {"links": {"/gone"}, "images": set()}})
+        with redirect_stdout(StringIO()) as out:
+            broken = self.resolver.report({"/", "/i.png"})
+        self.assertEqual(broken, [("a.md", "link", "/gone"), ("b.md", "link", "/gone")])
+        self.assertIn("4 targets checked, 2 broken in 2 pages", out.getvalue())
+
+    def test_site_urls(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            static = os.path.join(root, "static")
+            os.makedirs(os.path.join(content, "post"))
+            os.makedirs(os.path.join(static, "images"))
+            for path in ("content/index.md", "content/post/index.md", "static/images/a.png"):
+                with open(os.path.join(root, path), "w") as f:
+                    f.write("# x")
+            urls = site_urls(content, "template.html", static, os.path.join(root, "public"))
+        self.assertEqual(urls, {"/", "/post", "/images/a.png"})
+
+
+class TestResolvedPages(unittest.TestCase):
+
+    def test_generate_page_resolves_when_enabled(self):
+        resolver = LINK_RESOLVER
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "index.md")
+            template = os.path.join(root, "template.html")
+            dest = os.path.join(root, "public", "post")
+            os.makedirs(dest)
+            with open(source, "w") as f:
+                f.write("# Post\n\n[up](../)")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+            resolver.enabled, resolver.dest_dir = True, os.path.join(root, "public")
+            try:
+                with redirect_stdout(StringIO()):
+                    main.generate_page(source, template, dest)
+            finally:
+                resolver.enabled = False
+                resolver.drain()
+            with open(os.path.join(dest, "index.html")) as f:
+                self.assertIn('<a href="/">up</a>', f.read())
+
+    def test_incremental_builds_report_every_page(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            public = os.path.join(root, "public")
+            static = os.path.join(root, "static")
+            template = os.path.join(root, "template.html")
+            manifest = os.path.join(root, ".build", "manifest.json")
+            os.makedirs(os.path.join(content, "post"))
+            os.makedirs(static)
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\n[gone](/missing) ![x](img/x.png)")
+            with open(os.path.join(content, "post", "index.md"), "w") as f:
+                f.write("# Post\n\n[home](../)")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+            LINK_RESOLVER.enabled, LINK_RESOLVER.dest_dir = True, public
+            try:
+                reports = []
+                for _ in range(2):
+                    with redirect_stdout(StringIO()):
+                        build.build_incremental(content, template, static, public, manifest)
+                    reports.append(
+                        LINK_RESOLVER.broken(site_urls(content, template, static, public))
+                    )
+                    LINK_RESOLVER.drain()
+            finally:
+                LINK_RESOLVER.enabled = False
+                LINK_RESOLVER.drain()
+            home = os.path.join(content, "index.md")
+            self.assertEqual(
+                reports[0], [(home, "link", "/missing"), (home, "image", "/img/x.png")]
+            )
+            self.assertEqual(reports[1], reports[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import build
+import main
+from blockcache import BlockCache
+from depgraph import new_page_info
+from search import SearchIndex, record_terms, slugify, start_terms
+
+
+def page_terms(markdown, cache=None):
+    info = start_terms(new_page_info())
+    record_terms(main.markdown_to_html_node(markdown, cache), info)
+    return info
+
+
+class TestRecordTerms(unittest.TestCase):
+
+    def test_positions_and_headings(self):
+        info = page_terms("# Intro\n\nHello **big** world\n\n## Intro\n\nA world")
+        self.assertEqual(info["terms"]["world"], [3, 6])
+        self.assertEqual(info["terms"]["intro"], [0, 4])
+        self.assertNotIn("a", info["terms"])
+        self.assertEqual(info["headings"], [["intro", "Intro", 0], ["intro-1", "Intro", 4]])
+
+    def test_cached_blocks_index_the_same(self):
+        markdown = "# Title\n\nSome [linked](/x) text\n\n## Part two\n\n- item *one*\n- two"
+        cache = BlockCache()
+        main.markdown_to_html_node(markdown, cache)
+        self.assertEqual(page_terms(markdown, cache), page_terms(markdown))
+
+    def test_headings_get_their_anchor_ids(self):
+        markdown = "# Intro\n\nText\n\n## Intro\n\nMore"
+        cache = BlockCache()
+        main.markdown_to_html_node(markdown, cache)
+        for tree in (
+            main.markdown_to_html_node(markdown), main.markdown_to_html_node(markdown, cache)
+        ):
+            record_terms(tree, start_terms(new_page_info()))
+            html = tree.to_html()
+            self.assertIn('<h1 id="intro">Intro</h1>', html)
+            self.assertIn('<h2 id="intro-1">Intro</h2>', html)
+
+    def test_slugify(self):
+        self.assertEqual(slugify("The Lord of \"the Rings\"!", []), "the-lord-of-the-rings")
+        self.assertEqual(slugify("???", []), "section")
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        os.makedirs(os.path.join(self.content, "post"))
+        os.makedirs(self.static)
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nApples and pears")
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\nApples again")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def shard(self, prefix):
+        with open(os.path.join(self.public, "search", f"{prefix}.json")) as f:
+            return json.load(f)
+
+    def build(self):
+        with redirect_stdout(StringIO()) as out:
+            build.build_incremental(
+                self.content, self.template, self.static, self.public, self.manifest,
+                search=True,
+            )
+        return out.getvalue()
+
+    def test_index_is_sharded_by_prefix(self):
+        self.build()
+        self.assertEqual(self.shard("ap"), {"apples": [[0, 1], [1, 1]]})
+        with open(os.path.join(self.public, "search", "pages.json")) as f:
+            pages = json.load(f)
+        self.assertEqual(pages["1"]["url"], "/post")
+        self.assertEqual(pages["1"]["title"], "Post")
+        with open(os.path.join(self.public, "post", "index.html")) as f:
+            self.assertIn(f'<h1 id="{pages["1"]["headings"][0][0]}">', f.read())
+
+    def test_only_touched_shards_are_written(self):
+        self.build()
+        self.assertIn("0 shards written", self.build())
+        self.write(os.path.join(self.content, "post", "index.md"), "# Post\n\nPlums again")
+        out = self.build()
+        # "ap" loses a posting and "pl" is new; "again" and "post" keep their
+        # positions, so "ag" and "po" are left alone.
+        self.assertIn("2 shards written", out)
+        self.assertEqual(self.shard("ap"), {"apples": [[0, 1]]})
+        self.assertEqual(self.shard("pl"), {"plums": [[1, 1]]})
+
+    def test_removed_page_drops_its_terms(self):
+        self.build()
+        os.remove(os.path.join(self.content, "post", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "ag.json")))
+        index = SearchIndex.load(build.search_path(self.manifest))
+        self.assertEqual(list(index.pages), [os.path.join(self.content, "index.md")])
+
+
+if __name__ == "__main__":
+    unittest.main()
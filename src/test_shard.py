@@ -0,0 +1,79 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import corpus
+import shard
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "static"))
+        with open(os.path.join(self.root, "static", "index.css"), "w") as f:
+            f.write("body {}")
+        with open(os.path.join(self.root, "template.html"), "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        corpus.generate_corpus(os.path.join(self.root, "content"), pages=20, seed=9, blocks=5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, *args):
+        subprocess.run(
+            [sys.executable, MAIN, *args], cwd=self.root, check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    def outputs(self, dest):
+        found = {}
+        for root, _, files in os.walk(dest):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path) as f:
+                    found[os.path.relpath(path, dest)] = f.read()
+        return found
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard.shard_of("a/b.md", 7), shard.shard_of("a/b.md", 7))
+        counts = [0] * 4
+        for i in range(400):
+            counts[shard.shard_of(f"page{i}/index.md", 4)] += 1
+        self.assertTrue(all(count > 50 for count in counts))
+        with self.assertRaises(ValueError):
+            shard.parse_shard("4/4")
+
+    def test_shards_in_separate_processes_match_full_build(self):
+        self.run_main()
+        full = self.outputs(os.path.join(self.root, "public"))
+        shutil.rmtree(os.path.join(self.root, "public"))
+        for index in range(3):
+            self.run_main("--shard", f"{index}/3", "--shard-dir", f"shards/{index}")
+        self.run_main("--merge-shards", "shards/0", "shards/1", "shards/2")
+        self.assertEqual(self.outputs(os.path.join(self.root, "public")), full)
+        self.assertTrue(os.path.exists(os.path.join(self.root, ".build", "shards.json")))
+
+    def test_merge_requires_every_shard(self):
+        with redirect_stdout(StringIO()):
+            shard.build_shard(
+                os.path.join(self.root, "content"), os.path.join(self.root, "template.html"),
+                os.path.join(self.root, "shards", "0"), 0, 2,
+            )
+        with self.assertRaises(ValueError):
+            shard.merge_shards(
+                [os.path.join(self.root, "shards", "0")],
+                os.path.join(self.root, "static"), os.path.join(self.root, "public"),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
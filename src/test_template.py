@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+import main
+import template
+from htmlnode import LeafNode, ParentNode
+from template import Template
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_segments(self):
+        compiled = Template("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(compiled.segments, ["<title>", "Title", "</title>", "Content", "!"])
+        self.assertEqual(compiled.names, {"Title", "Content"})
+
+    def test_render_and_write(self):
+        compiled = Template("<h1>{{ Title }}</h1>{{ Content }}<footer>{{ Title }}</footer>")
+        values = {"Title": "Hi", "Content": ParentNode("p", [LeafNode("text")])}
+        expected = "<h1>Hi</h1><p>text</p><footer>Hi</footer>"
+        self.assertEqual(compiled.render(values), expected)
+        sink = StringIO()
+        compiled.write(sink, values)
+        self.assertEqual(sink.getvalue(), expected)
+
+    def test_unknown_placeholder(self):
+        compiled = Template("{{ Title }} {{ Author }}", "page.html")
+        with self.assertRaises(ValueError) as context:
+            compiled.render({"Title": "x"})
+        self.assertIn("{{ Author }}", str(context.exception))
+        self.assertIn("page.html", str(context.exception))
+
+
+class TestTemplateLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_cache_by_mtime(self):
+        path = os.path.join(self.root, "template.html")
+        self.write(path, "one {{ Title }}")
+        first = template.load_template(path)
+        self.assertIs(template.load_template(path), first)
+        self.write(path, "two {{ Title }}")
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(template.load_template(path).render({"Title": "x"}), "two x")
+
+    def test_directory_override(self):
+        default = os.path.join(self.root, "template.html")
+        content = os.path.join(self.root, "content")
+        self.write(default, "default")
+        self.write(os.path.join(content, "index.md"), "# a")
+        self.write(os.path.join(content, "blog", "template.html"), "blog")
+        self.write(os.path.join(content, "blog", "post", "index.md"), "# b")
+        pages = main.collect_pages(content, default, "public")
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(content, "blog", "post", "index.md"),
+                 os.path.join(content, "blog", "template.html"),
+                 os.path.join("public", "blog", "post")),
+                (os.path.join(content, "index.md"), default, "public"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -17,6 +17,12 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.ITALIC)
         node2 = TextNode("This is not the same text node", TextType.BOLD)
         self.assertNotEqual(node, node2)
+
+    def test_slots(self):
+        node = TextNode("text", TextType.LINKS, "/url")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
         
 
 if __name__ == "__main__":
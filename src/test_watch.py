@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import watch
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "post"))
+        self.write(self.template, "{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# a")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def test_changed_paths(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(watch.changed_paths(old, new), {"b", "c", "d"})
+
+    def test_poll_reports_changes_once(self):
+        watcher = watch.Watcher([self.content, self.template], interval=0, debounce=0)
+        self.assertEqual(watcher.poll(), set())
+        post = os.path.join(self.content, "post", "index.md")
+        self.write(post, "# b")
+        self.write(self.template, "<p>{{ Content }}</p>", mtime=1)
+        self.assertEqual(watcher.poll(), {post, self.template})
+        self.assertEqual(watcher.poll(), set())
+        os.remove(post)
+        self.assertEqual(watcher.wait_for_changes(), {post})
+
+    def test_failed_build_is_reported(self):
+        os.remove(self.template)
+        public = os.path.join(self.root, "public")
+        manifest = os.path.join(self.root, ".build", "manifest.json")
+        static = os.path.join(self.root, "static")
+        os.makedirs(static)
+        with redirect_stdout(StringIO()) as out:
+            ok = watch.try_build(self.content, self.template, static, public, manifest)
+        self.assertFalse(ok)
+        self.assertIn("Build failed: FileNotFoundError", out.getvalue())
+        self.write(self.template, "{{ Content }}")
+        with redirect_stdout(StringIO()):
+            self.assertTrue(
+                watch.try_build(self.content, self.template, static, public, manifest)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from build import build_incremental
+
+
+def snapshot(paths):
+    state = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for root, _, files in os.walk(path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                state[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def changed_paths(old, new):
+    changed = {path for path in new if old.get(path) != new[path]}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+class Watcher:
+
+    def __init__(self, paths, interval=0.5, debounce=0.2) -> None:
+        self.paths = paths
+        self.interval = interval
+        self.debounce = debounce
+        self.state = snapshot(paths)
+
+    def poll(self):
+        state = snapshot(self.paths)
+        changed = changed_paths(self.state, state)
+        self.state = state
+        return changed
+
+    def wait_for_changes(self):
+        changed = set()
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.poll()
+        # Editors often write several files (or one file several times) in a
+        # burst; keep collecting until the tree has been quiet for a while.
+        while True:
+            time.sleep(self.debounce)
+            more = self.poll()
+            if not more:
+                return changed
+            changed |= more
+
+
+def start_server(directory, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def try_build(*args):
+    # Editors replace files by renaming and sources vanish mid-walk; a failed
+    # build is reported and the next change gets another go, while the
+    # server keeps serving the last good output.
+    try:
+        build_incremental(*args)
+    except Exception as e:
+        print(f"Build failed: {type(e).__name__}: {e}")
+        return False
+    return True
+
+
+def watch(
+    content_dir, template_path, static_dir, dest_dir, manifest_path,
+    port=8888, workers=1, asset_mode="copy", interval=0.5, debounce=0.2,
+):
+    try_build(
+        content_dir, template_path, static_dir, dest_dir, manifest_path, workers,
+        asset_mode,
+    )
+    server = start_server(dest_dir, port)
+    print(f"Serving {dest_dir} on http://localhost:{port}, watching for changes")
+    watcher = Watcher([content_dir, static_dir, template_path], interval, debounce)
+    try:
+        while True:
+            changed = watcher.wait_for_changes()
+            start = time.perf_counter()
+            if try_build(
+                content_dir, template_path, static_dir, dest_dir, manifest_path,
+                workers, asset_mode,
+            ):
+                elapsed = time.perf_counter() - start
+                print(f"Rebuilt {len(changed)} changed file(s) in {elapsed * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()